@@ -1,57 +1,30 @@
 from __future__ import annotations
 
+import argparse
 import sqlite3
-from collections import Counter, defaultdict
-from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
 
-from keywords import TOPICS, NEG_WORDS
+from analyze import upsert_section
+from pipeline import (
+    Aggregate,
+    Post,
+    Scored,
+    TopKByGroup,
+    Window,
+    add_window_args,
+    classify,
+    iter_posts,
+    tee_aggregate,
+    window_from_args,
+)
+from storage import DB_PATH, connect
 
 
 BASE = Path(__file__).resolve().parents[1]
-DB_PATH = BASE / "data" / "voc.db"
 REPORT_PATH = BASE / "reports" / f"{date.today().isoformat()}.md"
 
 
-@dataclass
-class Post:
-    title: str
-    body: str
-    url: str
-
-
-def score_topic(text: str) -> tuple[str, int]:
-    best_topic = "OTHER"
-    best_score = 0
-    for topic, kws in TOPICS.items():
-        s = 0
-        for kw in kws:
-            if kw in text:
-                s += 1
-        if s > best_score:
-            best_topic, best_score = topic, s
-    return best_topic, best_score
-
-
-def is_negative(text: str) -> bool:
-    return any(w in text for w in NEG_WORDS)
-
-
-def upsert_section(md: str, header: str, content: str) -> str:
-    if header not in md:
-        return md.rstrip() + "\n\n" + header + "\n\n" + content
-
-    before, rest = md.split(header, 1)
-    rest = rest.lstrip("\n")
-    idx = rest.find("\n## ")
-    if idx == -1:
-        new_rest = "\n" + content
-    else:
-        new_rest = "\n" + content + "\n" + rest[idx + 1 :]
-    return before.rstrip() + "\n\n" + header + new_rest
-
-
 TEMPLATES = {
     "T2_과금/BM": {
         "hyp": [
@@ -154,29 +127,31 @@ def make_cards(posts_by_topic: dict[str, list[Post]], top_topics: list[str]) ->
     return "\n".join(blocks).strip() + "\n"
 
 
-def main():
-    with sqlite3.connect(DB_PATH) as conn:
-        rows = conn.execute(
-            "SELECT url, title, body FROM posts ORDER BY id DESC LIMIT 500"
-        ).fetchall()
+def evidence_key(s: Scored) -> tuple[int, int]:
+    # 토픽별 근거 글: 키워드 히트가 많은 글 우선, 같으면 최신 글
+    return (s.hits, s.post.id)
 
-    posts = [Post(url=r[0], title=r[1] or "", body=r[2] or "") for r in rows]
 
-    topic_counts = Counter()
-    posts_by_topic = defaultdict(list)
+def collect(conn: sqlite3.Connection, window: Window, k: int = 2) -> tuple[Aggregate, TopKByGroup]:
+    """한 번의 스캔으로 기간 집계 + 토픽별 근거 글 상위 k개."""
+    agg = Aggregate()
+    evidence = TopKByGroup(k=k, key=evidence_key)
+    for s in tee_aggregate(classify(iter_posts(conn, window)), agg):
+        evidence.push(s.topic, s)
+    return agg, evidence
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Issue → Action 카드 3장")
+    add_window_args(ap)
+    window = window_from_args(ap.parse_args())
 
-    for p in posts:
-        text = (p.title + " " + p.body).strip()
-        topic, sc = score_topic(text)
-        if sc == 0:
-            topic = "OTHER"
-        topic_counts[topic] += 1
-        posts_by_topic[topic].append(p)
+    with connect(DB_PATH) as conn:
+        agg, evidence = collect(conn, window)
 
     # OTHER 제외한 상위 토픽 3개
-    items = [(t, c) for t, c in topic_counts.items() if t != "OTHER"]
-    items.sort(key=lambda x: x[1], reverse=True)
-    top_topics = [t for t, _ in items[:3]]
+    top_topics = [t for t, _ in agg.ranked(3)]
+    posts_by_topic = {t: [s.post for s in evidence.get(t)] for t in top_topics}
 
     cards_md = make_cards(posts_by_topic, top_topics)
 
@@ -0,0 +1,461 @@
+from __future__ import annotations
+
+import argparse
+import math
+import re
+import sqlite3
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from pipeline import Aggregate, Post, Scored, Window, classify, iter_posts
+from storage import CHUNK, DB_PATH, bump_generation, connect, meta_value, set_meta
+
+
+# 참여도 가중치: 1(기본) + log 스케일 조회/추천/댓글
+# 조회 5,000 / 댓글 80 글 ≈ 5.3, 조회 20 / 반응 없는 글 ≈ 1.8
+VIEW_W = 0.25
+UP_W = 0.5
+CMT_W = 0.5
+
+# 속도(시간당 증가량) 계산 구간
+VELOCITY_HOURS = 24
+
+# sync_weights가 어디까지의 스냅샷(rowid)을 반영했는지 (meta 테이블 키)
+WEIGHT_SYNC_KEY = "weights_synced_rowid"
+
+# adopt_orphan_comments가 어디까지의 글(post_topic.post_id)을 확인했는지 (meta 테이블 키)
+ORPHAN_CHECK_KEY = "comment_parents_post_id"
+
+
+def engagement_weight(views: Optional[int], upvotes: Optional[int], comments: Optional[int]) -> float:
+    return (
+        1.0
+        + VIEW_W * math.log1p(views or 0)
+        + UP_W * math.log1p(upvotes or 0)
+        + CMT_W * math.log1p(comments or 0)
+    )
+
+
+# ---------------------------------------------------------------------------
+# 스냅샷 / 속도
+# ---------------------------------------------------------------------------
+
+def record_snapshots(
+    conn: sqlite3.Connection,
+    rows: Iterable[tuple[int, Optional[int], Optional[int], Optional[int]]],
+    ts: Optional[str] = None,
+) -> None:
+    """(post_no, views, upvotes, comments) 목록을 같은 시각의 스냅샷으로 저장한다."""
+    ts = ts or datetime.now().isoformat(timespec="seconds")
+    conn.executemany(
+        "INSERT INTO post_metrics_snapshot (post_no, ts, views, upvotes, comments) VALUES (?, ?, ?, ?, ?)",
+        [(no, ts, v, u, c) for no, v, u, c in rows if no is not None],
+    )
+
+
+def velocity(
+    conn: sqlite3.Connection,
+    post_nos: Optional[Iterable[int]] = None,
+    hours: int = VELOCITY_HOURS,
+    now: Optional[datetime] = None,
+    anchored: bool = False,
+) -> dict[int, tuple[float, float]]:
+    """최근 hours 시간 안의 첫/마지막 스냅샷 차이로 (조회/시간, 댓글/시간)을 구한다.
+
+    post_nos를 생략하면 구간 안에 스냅샷이 있는 모든 글. 스냅샷이 1개뿐인 글은 결과에서 빠진다.
+    anchored면 지금이 아니라 글마다 마지막 스냅샷 직전 hours 시간을 본다. 누적 가중치(post_topic.weight)용으로,
+    언제 다시 계산해도 같은 값이 나온다.
+    """
+    since = ((now or datetime.now()) - timedelta(hours=hours)).isoformat(timespec="seconds")
+    if post_nos is None:
+        chunks = [None]
+    else:
+        nos = list(post_nos)
+        chunks = [nos[i : i + CHUNK] for i in range(0, len(nos), CHUNK)]
+
+    out: dict[int, tuple[float, float]] = {}
+    for part in chunks:
+        cond, params = ("1", []) if anchored else ("ts >= ?", [since])
+        if part is not None:
+            cond += f" AND post_no IN ({','.join('?' * len(part))})"
+            params += part
+        snaps = f"SELECT post_no, ts, views, comments FROM post_metrics_snapshot WHERE {cond}"
+        if anchored:
+            snaps = f"""
+              SELECT post_no, ts, views, comments FROM (
+                SELECT *, MAX(ts) OVER (PARTITION BY post_no) AS last_ts
+                FROM post_metrics_snapshot WHERE {cond}
+              ) WHERE ts >= strftime('%Y-%m-%dT%H:%M:%S', last_ts, '-{int(hours)} hours')
+            """
+        rows = conn.execute(
+            f"""
+            WITH s AS (
+              SELECT post_no, ts, views, comments,
+                     ROW_NUMBER() OVER (PARTITION BY post_no ORDER BY ts) AS rn_first,
+                     ROW_NUMBER() OVER (PARTITION BY post_no ORDER BY ts DESC) AS rn_last
+              FROM ({snaps})
+            )
+            SELECT a.post_no, a.ts, a.views, a.comments, b.ts, b.views, b.comments
+            FROM s a JOIN s b ON a.post_no = b.post_no AND a.rn_first = 1 AND b.rn_last = 1
+            """,
+            params,
+        ).fetchall()
+        for no, ts0, v0, c0, ts1, v1, c1 in rows:
+            dt = (datetime.fromisoformat(ts1) - datetime.fromisoformat(ts0)).total_seconds() / 3600
+            if dt <= 0:
+                continue
+            out[no] = (((v1 or 0) - (v0 or 0)) / dt, ((c1 or 0) - (c0 or 0)) / dt)
+    return out
+
+
+def engagement_score(
+    views: Optional[int],
+    upvotes: Optional[int],
+    comments: Optional[int],
+    vel: Optional[tuple[float, float]] = None,
+) -> float:
+    """현재 누적 수치 가중치 + 최근 속도(시간당 조회/댓글 증가) 보너스."""
+    score = engagement_weight(views, upvotes, comments)
+    if vel:
+        vph, cph = vel
+        score += VIEW_W * math.log1p(max(vph, 0.0)) + CMT_W * math.log1p(max(cph, 0.0))
+    return score
+
+
+# ---------------------------------------------------------------------------
+# 증분 집계: post_topic (글별) → topic_daily (일자/토픽별)
+# ---------------------------------------------------------------------------
+
+def classify_new_posts(conn: sqlite3.Connection) -> int:
+    """아직 분류되지 않은 글만 분류해 post_topic에 넣고 topic_daily에 더한다.
+
+    가중치는 누적 참여도 + 스냅샷으로 잰 속도 (engagement_score). 속도는 CHUNK개씩 모아 한 번에 읽는다.
+    """
+    last = conn.execute("SELECT COALESCE(MAX(post_id), 0) FROM post_topic").fetchone()[0]
+
+    n = 0
+    pending: list[Scored] = []
+    kw_delta: Counter = Counter()
+
+    def flush():
+        vel = velocity(conn, [s.post.post_no for s in pending if s.post.post_no is not None], anchored=True)
+        batch: list[tuple] = []
+        delta: dict[tuple[str, str], list] = defaultdict(lambda: [0, 0, 0.0])
+        for s in pending:
+            p = s.post
+            day = p.fetched_at[:10]
+            w = engagement_score(p.views, p.upvotes, p.comments, vel.get(p.post_no))
+            batch.append((p.id, p.post_no, day, s.topic, s.hits, int(s.neg), w))
+            d = delta[(day, s.topic)]
+            d[0] += 1
+            d[1] += int(s.neg)
+            d[2] += w
+        conn.executemany(
+            "INSERT OR REPLACE INTO post_topic (post_id, post_no, day, topic, hits, neg, weight) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+        conn.executemany(
+            """
+            INSERT INTO topic_daily (day, topic, posts, neg, weight) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(day, topic) DO UPDATE SET
+              posts = posts + excluded.posts,
+              neg = neg + excluded.neg,
+              weight = weight + excluded.weight
+            """,
+            [(d, t, p, ng, w) for (d, t), (p, ng, w) in delta.items()],
+        )
+        conn.executemany(
+            """
+            INSERT INTO keyword_daily_hits (day, keyword, topic, hits) VALUES (?, ?, ?, ?)
+            ON CONFLICT(day, keyword, topic) DO UPDATE SET hits = hits + excluded.hits
+            """,
+            [(d, kw, t, h) for (d, kw, t), h in kw_delta.items()],
+        )
+        bump_generation(conn)
+        conn.commit()
+        pending.clear()
+        kw_delta.clear()
+
+    for s in classify(iter_posts(conn, Window(), after_id=last)):
+        pending.append(s)
+        for kw in s.keywords:
+            kw_delta[(s.post.fetched_at[:10], kw, s.topic)] += 1
+        n += 1
+        if len(pending) >= CHUNK:
+            flush()
+    if pending:
+        flush()
+    return n
+
+
+# 댓글 API의 reg_date: 올해는 "MM.DD HH:MM:SS", 지난해 이전은 "YYYY.MM.DD HH:MM:SS"
+_REG_DATE = re.compile(r"(?:(\d{4})[.-])?(\d{1,2})[.-](\d{1,2})")
+
+
+def comment_day(created_at: Optional[str], fetched_at: str) -> str:
+    """댓글이 달린 날(YYYY-MM-DD). 연도가 없으면 받은 날 기준으로 채우고, 못 읽으면 받은 날로."""
+    seen = fetched_at[:10]
+    m = _REG_DATE.match((created_at or "").strip())
+    if not m:
+        return seen
+    fetched = date.fromisoformat(seen)
+    try:
+        d = date(int(m[1] or fetched.year), int(m[2]), int(m[3]))
+        if not m[1] and d > fetched:
+            # 12.31에 달린 댓글을 1.1에 받은 경우
+            d = d.replace(year=d.year - 1)
+    except ValueError:
+        return seen
+    return d.isoformat()
+
+
+def classify_new_comments(conn: sqlite3.Connection) -> int:
+    """아직 분류되지 않은 댓글만 글과 같은 키워드 분류로 comment_topic에 넣고 topic_daily의 댓글 칸에 더한다.
+
+    "ㄹㅇ 이거 고쳐라"처럼 키워드가 안 걸리는 댓글은 달린 글의 토픽을 따른다 (hits=0으로 남음).
+    그래서 먼저 새 글을 분류해 둔다. 그때 달린 글이 아직 없던 댓글은 OTHER로 들어가고,
+    글이 나중에 분류되면 adopt_orphan_comments가 그 글의 토픽으로 옮긴다.
+    일자는 받은 날이 아니라 댓글이 달린 날(reg_date) 기준.
+    """
+    classify_new_posts(conn)
+    last = conn.execute("SELECT COALESCE(MAX(comment_id), 0) FROM comment_topic").fetchone()[0]
+    cur = conn.execute(
+        """
+        SELECT c.id, c.post_no, c.body, c.created_at, c.fetched_at, pt.topic
+        FROM comments c LEFT JOIN post_topic pt ON pt.post_no = c.post_no
+        WHERE c.id > ?
+        ORDER BY c.id
+        """,
+        (last,),
+    )
+
+    n = 0
+    while True:
+        rows = cur.fetchmany(CHUNK)
+        if not rows:
+            break
+        parent = {cid: topic for cid, _, _, _, _, topic in rows}
+        days = {cid: comment_day(created, at) for cid, _, _, created, at, _ in rows}
+        posts = [Post(id=cid, url="", title="", body=body or "", fetched_at=at, post_no=no) for cid, no, body, _, at, _ in rows]
+        batch: list[tuple] = []
+        delta: dict[tuple[str, str], list] = defaultdict(lambda: [0, 0])
+        for s in classify(posts):
+            p = s.post
+            topic = s.topic
+            if topic == "OTHER" and parent[p.id]:
+                topic = parent[p.id]
+            day = days[p.id]
+            batch.append((p.id, p.post_no, day, topic, s.hits, int(s.neg)))
+            d = delta[(day, topic)]
+            d[0] += 1
+            d[1] += int(s.neg)
+        conn.executemany(
+            "INSERT OR REPLACE INTO comment_topic (comment_id, post_no, day, topic, hits, neg) VALUES (?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+        conn.executemany(
+            """
+            INSERT INTO topic_daily (day, topic, comments, comment_neg) VALUES (?, ?, ?, ?)
+            ON CONFLICT(day, topic) DO UPDATE SET
+              comments = comments + excluded.comments,
+              comment_neg = comment_neg + excluded.comment_neg
+            """,
+            [(d, t, c, ng) for (d, t), (c, ng) in delta.items()],
+        )
+        bump_generation(conn)
+        conn.commit()
+        n += len(batch)
+    adopt_orphan_comments(conn)
+    return n
+
+
+def adopt_orphan_comments(conn: sqlite3.Connection) -> int:
+    """달린 글보다 먼저 분류돼 OTHER로 남은 키워드 없는 댓글을, 그 뒤 분류된 글의 토픽으로 옮긴다.
+
+    지난번 이후 post_topic에 새로 들어온 글만 본다 (meta 워터마크). 글의 토픽은 재분류(rebuild) 전까지
+    바뀌지 않으므로, 토픽이 있는 글에 달린 OTHER/hits=0 댓글은 글보다 먼저 분류된 것뿐이다.
+    """
+    last = meta_value(conn, ORPHAN_CHECK_KEY)
+    top = conn.execute("SELECT COALESCE(MAX(post_id), 0) FROM post_topic").fetchone()[0]
+    if top < last:
+        last = 0
+    cur = conn.execute(
+        "SELECT post_no, topic FROM post_topic WHERE post_id > ? AND post_id <= ? AND topic != 'OTHER' AND post_no IS NOT NULL",
+        (last, top),
+    )
+    moved = 0
+    while True:
+        rows = cur.fetchmany(CHUNK)
+        if not rows:
+            break
+        topic_of = dict(rows)
+        qs = ",".join("?" * len(topic_of))
+        orphans = conn.execute(
+            f"SELECT comment_id, post_no, day, neg FROM comment_topic WHERE post_no IN ({qs}) AND topic = 'OTHER' AND hits = 0",
+            list(topic_of),
+        ).fetchall()
+        delta: dict[tuple[str, str], list] = defaultdict(lambda: [0, 0])
+        for _, no, day, neg in orphans:
+            for topic, sign in (("OTHER", -1), (topic_of[no], 1)):
+                d = delta[(day, topic)]
+                d[0] += sign
+                d[1] += sign * neg
+        conn.executemany(
+            "UPDATE comment_topic SET topic = ? WHERE comment_id = ?", [(topic_of[no], cid) for cid, no, _, _ in orphans]
+        )
+        conn.executemany(
+            """
+            INSERT INTO topic_daily (day, topic, comments, comment_neg) VALUES (?, ?, ?, ?)
+            ON CONFLICT(day, topic) DO UPDATE SET
+              comments = comments + excluded.comments,
+              comment_neg = comment_neg + excluded.comment_neg
+            """,
+            [(d, t, c, ng) for (d, t), (c, ng) in delta.items()],
+        )
+        moved += len(orphans)
+    set_meta(conn, ORPHAN_CHECK_KEY, top)
+    if moved:
+        bump_generation(conn)
+    conn.commit()
+    return moved
+
+
+def sync_weights(conn: sqlite3.Connection, post_nos: Optional[Iterable[int]] = None) -> int:
+    """조회/추천/댓글(과 그 속도)이 바뀐 글의 가중치를 다시 계산해 차이만 topic_daily에 반영한다.
+
+    post_nos를 생략하면 지난 동기화 이후 스냅샷이 새로 쌓인 글만 CHUNK개씩 본다
+    (meta의 스냅샷 rowid 워터마크). 전체 글 수가 아니라 새 스냅샷 수에 비례한다.
+    """
+    changed = 0
+    if post_nos is not None:
+        nos = list(post_nos)
+        for i in range(0, len(nos), CHUNK):
+            changed += _sync_chunk(conn, nos[i : i + CHUNK])
+    else:
+        last = meta_value(conn, WEIGHT_SYNC_KEY)
+        top = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM post_metrics_snapshot").fetchone()[0]
+        if top < last:
+            # 스냅샷이 지워져 rowid가 되돌아간 경우: 남은 스냅샷을 처음부터
+            last = 0
+        cur = conn.execute(
+            "SELECT DISTINCT post_no FROM post_metrics_snapshot WHERE rowid > ? AND rowid <= ?", (last, top)
+        )
+        while True:
+            rows = cur.fetchmany(CHUNK)
+            if not rows:
+                break
+            changed += _sync_chunk(conn, [r[0] for r in rows])
+        set_meta(conn, WEIGHT_SYNC_KEY, top)
+    if changed:
+        bump_generation(conn)
+    conn.commit()
+    return changed
+
+
+def _sync_chunk(conn: sqlite3.Connection, nos: list[int]) -> int:
+    qs = ",".join("?" * len(nos))
+    rows = conn.execute(
+        f"""
+        SELECT pt.post_id, pt.post_no, pt.day, pt.topic, pt.weight, p.views, p.upvotes, p.comments
+        FROM post_topic pt JOIN posts p ON p.id = pt.post_id
+        WHERE pt.post_no IN ({qs})
+        """,
+        nos,
+    ).fetchall()
+    vel = velocity(conn, nos, anchored=True)
+    updates = []
+    delta: Counter = Counter()
+    for post_id, no, day, topic, old_w, views, upvotes, comments in rows:
+        new_w = engagement_score(views, upvotes, comments, vel.get(no))
+        if abs(new_w - old_w) > 1e-9:
+            updates.append((new_w, post_id))
+            delta[(day, topic)] += new_w - old_w
+    conn.executemany("UPDATE post_topic SET weight = ? WHERE post_id = ?", updates)
+    conn.executemany(
+        "UPDATE topic_daily SET weight = weight + ? WHERE day = ? AND topic = ?",
+        [(d, day, topic) for (day, topic), d in delta.items()],
+    )
+    return len(updates)
+
+
+def rebuild(conn: sqlite3.Connection) -> int:
+    """키워드 사전을 고친 뒤 등: 글별 분류와 누적 집계를 전부 지우고 처음부터 다시 만든다.
+
+    댓글 분류(comment_topic)도 같이 지우므로 이어서 classify_new_comments를 돌려야 한다.
+    """
+    for table in ("post_topic", "topic_daily", "keyword_daily_hits", "comment_topic"):
+        conn.execute(f"DELETE FROM {table}")
+    bump_generation(conn)
+    conn.commit()
+    return classify_new_posts(conn)
+
+
+def window_aggregate(conn: sqlite3.Connection, window: Window) -> Aggregate:
+    """topic_daily만 읽어 기간 집계를 만든다 (글 수와 무관하게 O(일수 × 토픽))."""
+    where, params = [], []
+    if window.since:
+        where.append("day >= ?")
+        params.append(window.since)
+    if window.until:
+        where.append("day <= ?")
+        params.append(window.until)
+    sql = "SELECT topic, SUM(posts), SUM(neg), SUM(weight), SUM(comments), SUM(comment_neg) FROM topic_daily"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY topic"
+
+    agg = Aggregate()
+    for row in conn.execute(sql, params):
+        _add_row(agg, *row)
+    return agg
+
+
+def _add_row(agg: Aggregate, topic: str, posts: int, neg: int, weight: float, comments: int, comment_neg: int) -> None:
+    # 댓글만 달린 (일자, 토픽) 줄은 글 수 칸을 건드리지 않음 (TOP10에 0건 토픽이 끼지 않게)
+    if posts:
+        agg.topic_counts[topic] = posts
+        agg.topic_neg[topic] = neg
+        agg.topic_weight[topic] = weight
+    if comments:
+        agg.topic_comments[topic] = comments
+        agg.topic_comment_neg[topic] = comment_neg
+
+
+def daily_aggregates(conn: sqlite3.Connection, since: Optional[str] = None, until: Optional[str] = None) -> dict[str, Aggregate]:
+    """일자별 Aggregate를 한 번의 쿼리로 (리포트 일괄 재생성에서 여러 날짜가 공유)."""
+    where, params = [], []
+    if since:
+        where.append("day >= ?")
+        params.append(since)
+    if until:
+        where.append("day <= ?")
+        params.append(until)
+    sql = "SELECT day, topic, posts, neg, weight, comments, comment_neg FROM topic_daily"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+
+    out: dict[str, Aggregate] = defaultdict(Aggregate)
+    for day, *row in conn.execute(sql, params):
+        _add_row(out[day], *row)
+    return dict(out)
+
+
+def days_with_data(conn: sqlite3.Connection) -> list[str]:
+    return [r[0] for r in conn.execute("SELECT DISTINCT day FROM topic_daily WHERE posts > 0 ORDER BY day DESC")]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="글별 분류 + 일자/토픽/키워드 누적 집계 갱신")
+    ap.add_argument("--rebuild", action="store_true", help="키워드 사전 변경 후 전체 재분류")
+    args = ap.parse_args()
+
+    with connect(DB_PATH) as conn:
+        n = rebuild(conn) if args.rebuild else classify_new_posts(conn)
+        c = classify_new_comments(conn)
+        m = sync_weights(conn)
+    print(f"[OK] classified {n} posts + {c} comments, re-weighted {m} posts")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,105 @@
 from __future__ import annotations
 
+import argparse
 import sqlite3
 from collections import Counter
-from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
+from typing import Optional
 
-from keywords import TOPICS, NEG_WORDS
+from aggregates import classify_new_posts, window_aggregate
+from classifier import HashedNB, relabel
+from pipeline import Aggregate, Window, add_window_args, aggregate, classify, iter_posts, window_from_args
+from storage import DB_PATH, connect
 
 
 BASE = Path(__file__).resolve().parents[1]
-DB_PATH = BASE / "data" / "voc.db"
 REPORT_PATH = BASE / "reports" / f"{date.today().isoformat()}.md"
 
 
-@dataclass
-class Row:
-    title: str
-    body: str
-
-
-def score_topic(text: str) -> tuple[str, int]:
-    best_topic = "OTHER"
-    best_score = 0
-    for topic, kws in TOPICS.items():
-        s = 0
-        for kw in kws:
-            if kw in text:
-                s += 1
-        if s > best_score:
-            best_topic, best_score = topic, s
-    return best_topic, best_score
-
-
-def is_negative(text: str) -> bool:
-    return any(w in text for w in NEG_WORDS)
-
-
-def render_top10_table(topic_counts: Counter, topic_neg: Counter) -> str:
+def render_top10_table(
+    topic_counts: Counter,
+    topic_neg: Counter,
+    topic_weight: Counter | None = None,
+    topic_comments: Counter | None = None,
+    topic_comment_neg: Counter | None = None,
+) -> str:
+    # topic_weight가 있으면 참여도 가중 볼륨 순으로 정렬하고 컬럼을 하나 더 보여줌
+    # topic_comments가 있으면 수집된 댓글 수/부정 댓글 비율 컬럼을 덧붙임
+    rank_by = topic_weight if topic_weight is not None else topic_counts
     items = [(t, c) for t, c in topic_counts.items() if t != "OTHER"]
-    items.sort(key=lambda x: x[1], reverse=True)
+    items.sort(key=lambda x: rank_by.get(x[0], 0), reverse=True)
     top = items[:10]
-    lines = [
-        "| Rank | Topic | Volume | NegRatio |",
-        "|---:|---|---:|---:|",
-    ]
+    if topic_weight is None:
+        lines = [
+            "| Rank | Topic | Volume | NegRatio |",
+            "|---:|---|---:|---:|",
+        ]
+    else:
+        lines = [
+            "| Rank | Topic | Weighted | Volume | NegRatio |",
+            "|---:|---|---:|---:|---:|",
+        ]
+    if topic_comments is not None:
+        lines[0] += " Comments | CmtNegRatio |"
+        lines[1] += "---:|---:|"
     for i, (topic, vol) in enumerate(top, start=1):
         neg_ratio = (topic_neg[topic] / vol) if vol else 0.0
-        lines.append(f"| {i} | {topic} | {vol} | {neg_ratio:.2f} |")
+        if topic_weight is None:
+            line = f"| {i} | {topic} | {vol} | {neg_ratio:.2f} |"
+        else:
+            line = f"| {i} | {topic} | {topic_weight[topic]:.1f} | {vol} | {neg_ratio:.2f} |"
+        if topic_comments is not None:
+            n_cmt = topic_comments.get(topic, 0)
+            cmt_neg = ((topic_comment_neg or Counter()).get(topic, 0) / n_cmt) if n_cmt else 0.0
+            line += f" {n_cmt} | {cmt_neg:.2f} |"
+        lines.append(line)
     return "\n".join(lines) + "\n"
 
 
+def topic_aggregate(
+    conn: sqlite3.Connection, window: Window, weighted: bool = False, model: Optional[HashedNB] = None
+) -> Aggregate:
+    """가중 모드는 일자별 누적 집계(topic_daily), 아니면 기간 글을 스트리밍 분류 (model이 있으면 OTHER 재분류)."""
+    if weighted:
+        return window_aggregate(conn, window)
+    scored = classify(iter_posts(conn, window))
+    if model is not None:
+        scored = relabel(scored, model)
+    return aggregate(scored)
+
+
+def render_top10_section(agg: Aggregate, window: Window, weighted: bool = False, hybrid: bool = False) -> str:
+    """TOP10 표 + Noise/Window 줄 (hybrid면 라벨 출처 줄 추가)."""
+    topic_counts = agg.topic_counts
+    # 댓글 집계는 topic_daily에만 있으므로 가중 모드에서, 댓글이 수집된 경우에만 표시
+    comments = agg.topic_comments if weighted and agg.topic_comments else None
+    top10_table = render_top10_table(
+        topic_counts, agg.topic_neg, agg.topic_weight if weighted else None, comments, agg.topic_comment_neg
+    )
+    total = sum(topic_counts.values())
+    noise = topic_counts.get("OTHER", 0)
+    noise_ratio = noise / total if total else 0
+    noise_line = f"- Noise(OTHER): {noise}/{total} ({noise_ratio:.2f})\n- Window: {window.label()}\n"
+    if hybrid:
+        # 라벨 출처를 함께 표시: 모델이 OTHER에서 건져낸 글 수와 원래(키워드만) Noise
+        by_model = sum(agg.topic_model.values())
+        noise_line += (
+            f"- Labels: keyword {total - noise - by_model} / model {by_model}"
+            f" (keyword-only Noise {noise + by_model}/{total} → {noise}/{total})\n"
+        )
+    return top10_table + "\n" + noise_line
+
+
+def skeleton(day: str) -> str:
+    return (
+        f"# 컴프야 VOC 레이더 리포트\n- Date: {day}\n\n"
+        "## 오늘의 이슈 TOP10\n\n"
+        "## 급상승 TOP3 (vs 어제)\n\n"
+        "## Issue → Action 카드 3장\n"
+    )
+
+
 def upsert_section(md: str, header: str, content: str) -> str:
     # header(예: "## 오늘의 이슈 TOP10") 아래 내용을 교체
     if header not in md:
@@ -59,56 +108,58 @@ def upsert_section(md: str, header: str, content: str) -> str:
     before, rest = md.split(header, 1)
     rest = rest.lstrip("\n")
 
-    # 다음 섹션(## ) 시작 전까지를 잘라 교체
-    idx = rest.find("\n## ")
+    # 다음 섹션(## ) 시작 전까지를 잘라 교체. 빈 섹션이면 rest가 곧바로 다음 헤더로 시작함
+    if rest.startswith("## "):
+        idx = 0
+    else:
+        idx = rest.find("\n## ")
+        idx = -1 if idx == -1 else idx + 1
     if idx == -1:
         new_rest = "\n" + content
     else:
-        new_rest = "\n" + content + "\n" + rest[idx + 1 :]
+        new_rest = "\n" + content + "\n" + rest[idx:]
 
     return before.rstrip() + "\n\n" + header + new_rest
 
 
 def main():
     if not DB_PATH.exists():
-        raise FileNotFoundError("data/voc.db not found. Run fetch_posts.py first.")
-
-    with sqlite3.connect(DB_PATH) as conn:
-        rows = conn.execute("SELECT title, body FROM posts ORDER BY id DESC LIMIT 500").fetchall()
-
-    data = [Row(title=r[0] or "", body=r[1] or "") for r in rows]
-
-    topic_counts = Counter()
-    topic_neg = Counter()
-
-    for r in data:
-        text = (r.title + " " + r.body).strip()
-        topic, sc = score_topic(text)
-        if sc == 0:
-            topic = "OTHER"
-        topic_counts[topic] += 1
-        if is_negative(text):
-            topic_neg[topic] += 1
+        raise FileNotFoundError(f"{DB_PATH} not found. Run fetch_posts.py first.")
+
+    ap = argparse.ArgumentParser(description="오늘의 이슈 TOP10 / Noise 리포트")
+    add_window_args(ap)
+    ap.add_argument("--weighted", action="store_true",
+                    help="조회/추천/댓글 참여도 가중 볼륨으로 순위 (일자별 누적 집계 사용)")
+    ap.add_argument("--classifier", choices=["keyword", "hybrid"], default="keyword",
+                    help="hybrid: 키워드로 못 잡은 OTHER 글을 학습형 분류기(classifier.py)로 다시 분류")
+    args = ap.parse_args()
+    if args.weighted:
+        if args.limit:
+            ap.error("--weighted는 일자별 집계를 읽으므로 --limit과 함께 쓸 수 없습니다")
+        if args.classifier != "keyword":
+            ap.error("--weighted 집계는 키워드 라벨만 사용합니다")
+        if not (args.window or args.since or args.until):
+            args.window = "day"
+    window = window_from_args(args)
+
+    with connect(DB_PATH) as conn:
+        model = None
+        if args.weighted:
+            classify_new_posts(conn)
+        elif args.classifier == "hybrid":
+            model = HashedNB.load(conn)
+            if model is None:
+                raise SystemExit("모델이 없습니다. 먼저 `python src/classifier.py train`을 실행하세요.")
+        agg = topic_aggregate(conn, window, args.weighted, model)
 
     # 리포트 파일 없으면 기본 뼈대 생성
     if not REPORT_PATH.exists():
-        REPORT_PATH.write_text(
-            f"# 컴프야 VOC 레이더 리포트\n- Date: {date.today().isoformat()}\n\n"
-            "## 오늘의 이슈 TOP10\n\n"
-            "## 급상승 TOP3 (vs 어제)\n\n"
-            "## Issue → Action 카드 3장\n",
-            encoding="utf-8",
-        )
+        REPORT_PATH.write_text(skeleton(date.today().isoformat()), encoding="utf-8")
 
     md = REPORT_PATH.read_text(encoding="utf-8")
+    section = render_top10_section(agg, window, args.weighted, args.classifier == "hybrid")
+    md = upsert_section(md, "## 오늘의 이슈 TOP10", section)
 
-    top10_table = render_top10_table(topic_counts, topic_neg)
-    total = sum(topic_counts.values())
-    noise = topic_counts.get("OTHER", 0)
-    noise_ratio = noise / total if total else 0
-    noise_line = f"- Noise(OTHER): {noise}/{total} ({noise_ratio:.2f})\n"
-    md = upsert_section(md, "## 오늘의 이슈 TOP10", top10_table + "\n" + noise_line)
-    
     REPORT_PATH.write_text(md, encoding="utf-8")
     print(f"[OK] wrote TOP10 to {REPORT_PATH}")
 
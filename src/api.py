@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from action_cards import collect
+from aggregates import daily_aggregates, window_aggregate
+from analyze import topic_aggregate
+from classifier import HashedNB
+from highlights import QUICK_ACTION, rank_highlights
+from pipeline import Aggregate, Post, Scored, Window, window_from_args
+from storage import DB_PATH, connect, generation
+from trending import compare_days, topic_counts_for_date, trending_deltas
+
+
+DEFAULT_PORT = 8780
+DEFAULT_TTL = 30.0  # 초. 수집(generation 증가)이 있으면 TTL 전이라도 비움
+DEFAULT_CACHE_SIZE = 256
+EXCERPT_CHARS = 200
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------------------------------------------------------------------------
+# 캐시: LRU + TTL, 수집 세대(generation)가 바뀌면 통째로 무효화
+# ---------------------------------------------------------------------------
+
+class ResponseCache:
+    """응답 본문(bytes)을 키별로 보관. 같은 키를 동시에 놓친 요청은 하나만 계산하고 나머지는 기다림."""
+
+    def __init__(self, size: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.gen: Optional[int] = None
+        self.lock = threading.Lock()
+        self.items: OrderedDict[tuple, tuple[float, bytes]] = OrderedDict()
+        self.inflight: dict[tuple, threading.Event] = {}
+        self.hits = self.misses = self.invalidations = 0
+
+    def check_generation(self, gen: int) -> None:
+        with self.lock:
+            if gen != self.gen:
+                if self.gen is not None:
+                    self.invalidations += 1
+                self.items.clear()
+                self.gen = gen
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], bytes]) -> tuple[bytes, bool]:
+        """(본문, 캐시 적중 여부)."""
+        while True:
+            with self.lock:
+                hit = self.items.get(key)
+                if hit and hit[0] > time.monotonic():
+                    self.items.move_to_end(key)
+                    self.hits += 1
+                    return hit[1], True
+                waiter = self.inflight.get(key)
+                if waiter is None:
+                    gen = self.gen
+                    done = self.inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # 같은 키를 누가 계산 중이면 끝날 때까지 기다렸다가 다시 조회
+            waiter.wait()
+
+        try:
+            body = compute()
+            with self.lock:
+                # 계산 도중 무효화됐으면 오래된 결과를 넣지 않음
+                if gen == self.gen and self.size > 0:
+                    self.items[key] = (time.monotonic() + self.ttl, body)
+                    self.items.move_to_end(key)
+                    while len(self.items) > self.size:
+                        self.items.popitem(last=False)
+            return body, False
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            done.set()
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "entries": len(self.items),
+                "size": self.size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "generation": self.gen,
+            }
+
+
+# ---------------------------------------------------------------------------
+# 파라미터 → Window / 직렬화
+# ---------------------------------------------------------------------------
+
+def _date(q: dict[str, str], name: str) -> Optional[str]:
+    v = q.get(name)
+    if not v:
+        return None
+    try:
+        return date.fromisoformat(v).isoformat()
+    except ValueError:
+        raise ApiError(400, f"{name}: YYYY-MM-DD 형식이어야 합니다") from None
+
+
+def _int(q: dict[str, str], name: str, default: Optional[int], lo: int = 1, hi: int = 100) -> Optional[int]:
+    v = q.get(name)
+    if not v:
+        return default
+    try:
+        n = int(v)
+    except ValueError:
+        raise ApiError(400, f"{name}: 정수여야 합니다") from None
+    if not lo <= n <= hi:
+        raise ApiError(400, f"{name}: {lo}~{hi} 범위여야 합니다")
+    return n
+
+
+def _flag(q: dict[str, str], name: str) -> bool:
+    return q.get(name, "").lower() in ("1", "true", "yes")
+
+
+def window_from_query(q: dict[str, str], default: Optional[str] = None) -> Window:
+    """CLI와 같은 규칙(window_from_args)으로 window/since/until/limit을 해석."""
+    win = q.get("window") or default
+    if win and win not in ("day", "week", "month", "all"):
+        raise ApiError(400, "window: day / week / month / all")
+    args = argparse.Namespace(
+        window=win,
+        since=_date(q, "since"),
+        until=_date(q, "until"),
+        limit=_int(q, "limit", None, hi=100_000),
+    )
+    return window_from_args(args)
+
+
+def window_json(w: Window) -> dict[str, Any]:
+    return {"since": w.since, "until": w.until, "limit": w.limit, "label": w.label()}
+
+
+def post_json(p: Post) -> dict[str, Any]:
+    body = p.body or ""
+    return {
+        "id": p.id,
+        "post_no": p.post_no,
+        "url": p.url,
+        "title": p.title,
+        "excerpt": body[:EXCERPT_CHARS] + ("…" if len(body) > EXCERPT_CHARS else ""),
+        "fetched_at": p.fetched_at,
+        "views": p.views,
+        "upvotes": p.upvotes,
+        "comments": p.comments,
+    }
+
+
+def scored_json(s: Scored) -> dict[str, Any]:
+    return {"topic": s.topic, "hits": s.hits, "neg": s.neg, "source": s.source, "post": post_json(s.post)}
+
+
+def agg_json(agg: Aggregate) -> dict[str, dict[str, float]]:
+    return {
+        t: {
+            "posts": agg.topic_counts.get(t, 0),
+            "neg": agg.topic_neg.get(t, 0),
+            "weight": round(agg.topic_weight.get(t, 0.0), 3),
+            "comments": agg.topic_comments.get(t, 0),
+            "comment_neg": agg.topic_comment_neg.get(t, 0),
+        }
+        for t in sorted(agg.topic_counts.keys() | agg.topic_comments.keys(),
+                        key=lambda t: (agg.topic_counts.get(t, 0), agg.topic_comments.get(t, 0)), reverse=True)
+    }
+
+
+# ---------------------------------------------------------------------------
+# 엔드포인트: 리포트 스크립트와 같은 계산 함수를 그대로 호출
+# ---------------------------------------------------------------------------
+
+def ep_topics(conn: sqlite3.Connection, q: dict[str, str]) -> dict[str, Any]:
+    """일자별 토픽 볼륨 (topic_daily만 읽음)."""
+    window = window_from_query(q, default="week")
+    if window.limit:
+        raise ApiError(400, "topics는 일자 집계를 읽으므로 limit을 쓸 수 없습니다")
+    days = daily_aggregates(conn, window.since, window.until)
+    return {
+        "window": window_json(window),
+        "total": agg_json(window_aggregate(conn, window)),
+        "days": [{"day": d, "topics": agg_json(days[d])} for d in sorted(days)],
+    }
+
+
+def ep_top10(conn: sqlite3.Connection, q: dict[str, str]) -> dict[str, Any]:
+    weighted = _flag(q, "weighted")
+    hybrid = q.get("classifier") == "hybrid"
+    if weighted and hybrid:
+        raise ApiError(400, "weighted 집계는 키워드 라벨만 사용합니다")
+    window = window_from_query(q, default="day" if weighted else None)
+    if weighted and window.limit:
+        raise ApiError(400, "weighted는 일자 집계를 읽으므로 limit을 쓸 수 없습니다")
+    model = None
+    if hybrid:
+        model = HashedNB.load(conn)
+        if model is None:
+            raise ApiError(409, "모델이 없습니다. 먼저 `python src/classifier.py train`을 실행하세요.")
+
+    agg = topic_aggregate(conn, window, weighted, model)
+    total = agg.total
+    noise = agg.topic_counts.get("OTHER", 0)
+    rows = []
+    for rank, (t, _) in enumerate(agg.ranked(10, weighted), start=1):
+        vol = agg.topic_counts.get(t, 0)
+        row = {"rank": rank, "topic": t, "volume": vol, "neg_ratio": round(agg.topic_neg.get(t, 0) / vol, 2) if vol else 0.0}
+        if weighted:
+            row["weighted"] = round(agg.topic_weight.get(t, 0.0), 1)
+            row["comments"] = agg.topic_comments.get(t, 0)
+            row["comment_neg"] = agg.topic_comment_neg.get(t, 0)
+        if hybrid:
+            row["by_model"] = agg.topic_model.get(t, 0)
+        rows.append(row)
+    return {
+        "window": window_json(window),
+        "total": total,
+        "noise": {"posts": noise, "ratio": round(noise / total, 2) if total else 0.0},
+        "top10": rows,
+    }
+
+
+def ep_trending(conn: sqlite3.Connection, q: dict[str, str]) -> dict[str, Any]:
+    weighted = _flag(q, "weighted")
+    pair = compare_days(conn, _date(q, "as_of"))
+    if pair is None:
+        return {"today": None, "yesterday": None, "trending": []}
+    today, yday = pair
+    c_today = topic_counts_for_date(conn, today, weighted)
+    c_yday = topic_counts_for_date(conn, yday, weighted)
+    rows = [
+        {"topic": t, "delta": round(d, 1), "today": round(a, 1), "yesterday": round(b, 1)}
+        for t, d, a, b in trending_deltas(c_today, c_yday, _int(q, "k", 3, hi=20))
+    ]
+    return {"today": today, "yesterday": yday, "weighted": weighted, "trending": rows}
+
+
+def ep_highlights(conn: sqlite3.Connection, q: dict[str, str]) -> dict[str, Any]:
+    window = window_from_query(q, default="day")
+    ranked = rank_highlights(conn, window, _flag(q, "weighted"), _int(q, "k", 3, hi=20))
+    return {
+        "window": window_json(window),
+        "highlights": [dict(scored_json(s), quick_action=QUICK_ACTION.get(s.topic)) for s in ranked],
+    }
+
+
+def ep_evidence(conn: sqlite3.Connection, q: dict[str, str]) -> dict[str, Any]:
+    """토픽별 근거 글 (action_cards와 같은 선정). topic을 안 주면 상위 3개 토픽."""
+    window = window_from_query(q)
+    agg, evidence = collect(conn, window, _int(q, "k", 2, hi=20))
+    topic = q.get("topic")
+    topics = [topic] if topic else [t for t, _ in agg.ranked(3)]
+    return {
+        "window": window_json(window),
+        "evidence": {t: [scored_json(s) for s in evidence.get(t)] for t in topics},
+    }
+
+
+ENDPOINTS: dict[str, Callable[[sqlite3.Connection, dict[str, str]], dict[str, Any]]] = {
+    "/api/topics": ep_topics,
+    "/api/top10": ep_top10,
+    "/api/trending": ep_trending,
+    "/api/highlights": ep_highlights,
+    "/api/evidence": ep_evidence,
+}
+
+
+# ---------------------------------------------------------------------------
+# 서버
+# ---------------------------------------------------------------------------
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # 기본 5면 대시보드 여러 개가 동시에 붙을 때 SYN이 버려져 1초씩 재시도
+
+    def __init__(self, addr: tuple[str, int], db_path: Path, cache: ResponseCache):
+        super().__init__(addr, Handler)
+        # 스키마가 없으면 한 번만 만들어 두고, 요청은 읽기 전용 연결로만 처리
+        connect(db_path).close()
+        self.db_uri = f"file:{quote(str(db_path.resolve()))}?mode=ro"
+        self.cache = cache
+        self.pool: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @contextmanager
+    def conn(self) -> Iterator[sqlite3.Connection]:
+        # 요청마다 스레드가 새로 뜨므로 연결은 풀에서 돌려 씀
+        try:
+            c = self.pool.get_nowait()
+        except queue.Empty:
+            c = sqlite3.connect(self.db_uri, uri=True, timeout=30, check_same_thread=False)
+        broken = False
+        try:
+            yield c
+        except sqlite3.Error:
+            broken = True
+            raise
+        finally:
+            # DB 오류가 난 연결은 떼지 못한 아카이브 같은 상태가 남았을 수 있어 풀에 돌려놓지 않음
+            if broken:
+                c.close()
+            else:
+                self.pool.put(c)
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: ApiServer
+    protocol_version = "HTTP/1.1"  # 대시보드 폴링이 연결을 재사용하도록
+    disable_nagle_algorithm = True  # 헤더/본문을 나눠 쓸 때 keep-alive 응답이 40ms씩 묶이지 않게
+
+    def log_message(self, format, *args):  # noqa: A002 - 기본 접근 로그 끔
+        pass
+
+    def _send(self, status: int, body: bytes, cache: str = "") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if cache:
+            self.send_header("X-Cache", cache)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        sp = urlsplit(self.path)
+        path = sp.path.rstrip("/")
+        q = dict(parse_qsl(sp.query))
+        cache = self.server.cache
+        try:
+            with self.server.conn() as conn:
+                cache.check_generation(generation(conn))
+                if path == "/api/health":
+                    return self._send(200, _dump({"ok": True, "cache": cache.stats()}))
+                ep = ENDPOINTS.get(path)
+                if ep is None:
+                    raise ApiError(404, f"unknown endpoint: {path}")
+                key = (path, tuple(sorted(q.items())), date.today().isoformat())
+                body, hit = cache.get_or_compute(key, lambda: _dump(ep(conn, q)))
+            self._send(200, body, "HIT" if hit else "MISS")
+        except ApiError as e:
+            self._send(e.status, _dump({"error": str(e)}))
+        except sqlite3.Error as e:
+            self._send(503, _dump({"error": f"db: {e}"}))
+        except Exception as e:
+            # 본문 해제 실패, 렌더링 버그 등: 연결을 그냥 끊지 말고 JSON으로 알림
+            print(f"[ERROR] {self.path}: {type(e).__name__}: {e}")
+            self._send(500, _dump({"error": f"internal: {type(e).__name__}: {e}"}))
+
+
+def _dump(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def start(db_path: Path = DB_PATH, host: str = "127.0.0.1", port: int = 0,
+          ttl: float = DEFAULT_TTL, cache_size: int = DEFAULT_CACHE_SIZE) -> ApiServer:
+    """백그라운드 스레드로 서버를 띄운다 (port=0이면 빈 포트)."""
+    srv = ApiServer((host, port), db_path, ResponseCache(cache_size, ttl))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main():
+    ap = argparse.ArgumentParser(description="voc.db 읽기 전용 JSON API (대시보드용, 오프라인)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="응답 캐시 유지 시간(초)")
+    ap.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="캐시할 응답 수 (0=캐시 끔)")
+    args = ap.parse_args()
+
+    if not DB_PATH.exists():
+        raise FileNotFoundError(f"{DB_PATH} not found. Run fetch_posts.py first.")
+
+    srv = ApiServer((args.host, args.port), DB_PATH, ResponseCache(args.cache_size, args.ttl))
+    print(f"[OK] VOC API on {srv.base_url} (db={DB_PATH}, ttl={args.ttl}s, cache={args.cache_size})")
+    print(f"     {', '.join(sorted(ENDPOINTS))}, /api/health")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[CACHE] {srv.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,40 @@
 from __future__ import annotations
 
-import sqlite3
+import argparse
 from collections import Counter
-from dataclasses import dataclass
-from pathlib import Path
 
-from keywords import TOPICS, NEG_WORDS
+from pipeline import add_window_args, classify, iter_posts, window_from_args
+from storage import DB_PATH, connect
 
-BASE = Path(__file__).resolve().parents[1]
-DB_PATH = BASE / "data" / "voc.db"
-
-@dataclass
-class Post:
-    url: str
-    title: str
-    body: str
-
-def score_topic(text: str) -> tuple[str, int]:
-    best_topic = "OTHER"
-    best_score = 0
-    for topic, kws in TOPICS.items():
-        s = 0
-        for kw in kws:
-            if kw in text:
-                s += 1
-        if s > best_score:
-            best_topic, best_score = topic, s
-    return best_topic, best_score
-
-def is_negative(text: str) -> bool:
-    return any(w in text for w in NEG_WORDS)
 
 def main(limit: int = 50):
-    with sqlite3.connect(DB_PATH) as conn:
-        rows = conn.execute(
-            "SELECT url, title, body FROM posts ORDER BY id DESC LIMIT 500"
-        ).fetchall()
-
-    posts = [Post(url=r[0], title=r[1] or "", body=r[2] or "") for r in rows]
+    ap = argparse.ArgumentParser(description="OTHER(미분류) 글 점검")
+    add_window_args(ap)
+    ap.add_argument("--show", type=int, default=limit, help="출력할 OTHER 글 수")
+    args = ap.parse_args()
+    window = window_from_args(args)
 
-    other_posts = []
+    other_cnt = 0
     neg_cnt = 0
-    for p in posts:
-        text = (p.title + " " + p.body).strip()
-        topic, sc = score_topic(text)
-        if sc == 0:
-            topic = "OTHER"
-        if topic == "OTHER":
-            other_posts.append(p)
-            if is_negative(text):
+    head_words = Counter()
+    samples = []  # 최신순 앞에서 show개만 보관
+
+    with connect(DB_PATH) as conn:
+        for s in classify(iter_posts(conn, window)):
+            if s.topic != "OTHER":
+                continue
+            other_cnt += 1
+            if s.neg:
                 neg_cnt += 1
+            # 제목 첫 단어만
+            head_words[(s.post.title.strip().split()[:1] or [""])[0]] += 1
+            if len(samples) < args.show:
+                samples.append(s)
 
-    print(f"[OTHER] {len(other_posts)} posts (neg={neg_cnt})\n")
+    print(f"[OTHER] {other_cnt} posts (neg={neg_cnt}) / window: {window.label()}\n")
 
     # OTHER 제목 상위 패턴 확인(대충 느낌 잡기)
-    head_words = []
-    for p in other_posts:
-        # 제목 첫 단어만
-        w = (p.title.strip().split()[:1] or [""])[0]
-        head_words.append(w)
-    top_heads = Counter(head_words).most_common(10)
+    top_heads = head_words.most_common(10)
     print("[OTHER title head top10]")
     for w, c in top_heads:
         if w:
@@ -68,10 +43,10 @@ def main(limit: int = 50):
 
     # 실제 글 목록 출력
     print("[SAMPLE OTHER LIST]")
-    for i, p in enumerate(other_posts[:limit], start=1):
-        flag = " (NEG)" if is_negative((p.title + " " + p.body)) else ""
-        print(f"{i:02d}. {p.title[:60]}{flag}")
-        print(f"    {p.url}")
+    for i, s in enumerate(samples, start=1):
+        flag = " (NEG)" if s.neg else ""
+        print(f"{i:02d}. {s.post.title[:60]}{flag}")
+        print(f"    {s.post.url}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
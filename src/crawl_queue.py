@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import os
+import random
+import socket
+import sqlite3
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from storage import DB_PATH, connect, post_no_from_url
+
+
+# 재시도: 1분 → 2분 → 4분 ... 최대 1시간, MAX_ATTEMPTS회 실패하면 failed로 멈춤
+BACKOFF_BASE_SEC = 60
+BACKOFF_MAX_SEC = 3600
+MAX_ATTEMPTS = 5
+
+# running 상태로 이 시간 넘게 끝나지 않은 항목은 워커가 죽은 것으로 보고 다시 가져감
+LEASE_SEC = 600
+
+
+@dataclass
+class Item:
+    id: int
+    url: str
+    post_no: Optional[int]
+    attempts: int
+
+
+def _now() -> datetime:
+    return datetime.now()
+
+
+def _ts(dt: datetime) -> str:
+    return dt.isoformat(timespec="seconds")
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(conn: sqlite3.Connection, urls: Iterable[str]) -> int:
+    """URL을 글 번호 기준으로 큐에 넣는다. 이미 있는 글(완료/실패 포함)은 건드리지 않는다."""
+    now = _ts(_now())
+    cur = conn.executemany(
+        """
+        INSERT OR IGNORE INTO crawl_queue (url, post_no, state, next_attempt_at, updated_at)
+        VALUES (?, ?, 'pending', ?, ?)
+        """,
+        [(u, post_no_from_url(u), now, now) for u in urls],
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+def claim(conn: sqlite3.Connection, who: str) -> Optional[Item]:
+    """처리할 항목 1개를 원자적으로 running으로 바꾸고 가져온다.
+
+    UPDATE ... WHERE id = (SELECT ...) RETURNING 한 문장이 쓰기 잠금 안에서 실행되므로
+    여러 프로세스가 동시에 호출해도 같은 항목을 두 번 가져가지 않는다.
+    """
+    now = _now()
+    rows = conn.execute(
+        """
+        UPDATE crawl_queue
+        SET state = 'running', claimed_by = ?, claimed_at = ?, updated_at = ?, attempts = attempts + 1
+        WHERE id = (
+          SELECT id FROM crawl_queue
+          WHERE (state = 'pending' AND next_attempt_at <= ?)
+             OR (state = 'running' AND claimed_at < ?)
+          ORDER BY next_attempt_at, id
+          LIMIT 1
+        )
+        RETURNING id, url, post_no, attempts
+        """,
+        (who, _ts(now), _ts(now), _ts(now), _ts(now - timedelta(seconds=LEASE_SEC))),
+    ).fetchall()
+    conn.commit()
+    return Item(*rows[0]) if rows else None
+
+
+def complete(conn: sqlite3.Connection, item: Item) -> None:
+    conn.execute(
+        "UPDATE crawl_queue SET state = 'done', last_error = NULL, updated_at = ? WHERE id = ?",
+        (_ts(_now()), item.id),
+    )
+    conn.commit()
+
+
+def backoff_seconds(attempts: int) -> float:
+    base = min(BACKOFF_BASE_SEC * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SEC)
+    # 여러 워커가 같은 시각에 몰리지 않도록 ±20% 흔들기
+    return base * random.uniform(0.8, 1.2)
+
+
+def fail(conn: sqlite3.Connection, item: Item, error: str, wait: Optional[float] = None) -> str:
+    """실패를 기록하고 backoff 후 재시도하도록 되돌린다. 최종 상태를 돌려준다.
+
+    wait(초)를 주면(429의 Retry-After 등) 지수 backoff 대신 그 시간 뒤에 다시 시도한다.
+    """
+    now = _now()
+    if item.attempts >= MAX_ATTEMPTS:
+        state, nxt = "failed", now
+    else:
+        delay = wait if wait is not None else backoff_seconds(item.attempts)
+        state, nxt = "pending", now + timedelta(seconds=delay)
+    conn.execute(
+        """
+        UPDATE crawl_queue
+        SET state = ?, last_error = ?, next_attempt_at = ?, updated_at = ?
+        WHERE id = ?
+        """,
+        (state, error[:500], _ts(nxt), _ts(now), item.id),
+    )
+    conn.commit()
+    return state
+
+
+def retry_failed(conn: sqlite3.Connection) -> int:
+    cur = conn.execute(
+        "UPDATE crawl_queue SET state = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ? WHERE state = 'failed'",
+        (_ts(_now()), _ts(_now())),
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+def stats(conn: sqlite3.Connection) -> dict[str, int]:
+    return dict(conn.execute("SELECT state, COUNT(*) FROM crawl_queue GROUP BY state").fetchall())
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    with connect(DB_PATH) as conn:
+        if cmd == "stats":
+            print(f"[QUEUE] {stats(conn)}")
+            for url, attempts, err in conn.execute(
+                "SELECT url, attempts, last_error FROM crawl_queue WHERE state = 'failed' ORDER BY updated_at DESC LIMIT 10"
+            ):
+                print(f" - ({attempts}x) {url}: {err}")
+        elif cmd == "retry-failed":
+            print(f"[OK] re-queued {retry_failed(conn)} failed items")
+        else:
+            raise SystemExit("usage: python src/crawl_queue.py [stats|retry-failed]")
+
+
+if __name__ == "__main__":
+    main()
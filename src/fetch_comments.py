@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+from aggregates import classify_new_comments
+from fetch_list import BASE, HEADERS, LIST_URL, retry_after
+from fetch_posts import clean_text, parse_int
+from storage import DB_PATH, connect
+
+
+# 디시 댓글 목록 API (view 페이지가 XHR로 부르는 것과 같음)
+COMMENT_URL = BASE + "/board/comment/"
+
+# list_meta.seen_at 기준: 이 시간 안에 리스트에서 본 글만 후보 (최근 활동 글)
+RECENT_HOURS = 48
+
+# 이 개수의 글마다 DB에 한 번씩 쓴다
+BATCH = 50
+
+# 한 글에서 넘겨볼 최대 댓글 페이지 수 (최신순이라 보통 1페이지에서 워터마크를 만남)
+MAX_PAGES = 20
+
+COMMENT_RETRIES = 3
+
+
+@dataclass
+class Comment:
+    no: int
+    parent: Optional[int]
+    author: str
+    body: str
+    created_at: str
+
+
+@dataclass
+class Target:
+    post_no: int
+    url: str
+    listed: int  # 리스트 페이지의 댓글 수
+    last_cmt_no: int  # 지금까지 받은 가장 큰 댓글 번호 (워터마크)
+
+
+def pending_posts(conn: sqlite3.Connection, hours: int = RECENT_HOURS, limit: Optional[int] = None) -> list[Target]:
+    """리스트 댓글 수가 워터마크보다 늘어난 최근 글. 새 댓글이 많은 글부터.
+
+    최근 리스트에서 본 글(list_meta.seen_at 인덱스)만 훑으므로 전체 글 수와 무관하다.
+    """
+    since = (datetime.now() - timedelta(hours=hours)).isoformat(timespec="seconds")
+    sql = """
+        SELECT lm.post_no, p.url, lm.comments, COALESCE(cs.last_cmt_no, 0)
+        FROM list_meta lm
+        JOIN posts p ON p.post_no = lm.post_no
+        LEFT JOIN comment_state cs ON cs.post_no = lm.post_no
+        WHERE lm.seen_at >= ? AND lm.comments > COALESCE(cs.seen, 0)
+        ORDER BY lm.comments - COALESCE(cs.seen, 0) DESC, lm.post_no DESC
+    """
+    params: list = [since]
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return [Target(*r) for r in conn.execute(sql, params)]
+
+
+def esno_token(session: requests.Session) -> str:
+    """댓글 API에 같이 보내야 하는 e_s_n_o 값. 목록/상세 페이지의 hidden input에 들어있다."""
+    r = session.get(LIST_URL.format(page=1), headers=HEADERS, timeout=15)
+    r.raise_for_status()
+    el = BeautifulSoup(r.text, "lxml").select_one("input#e_s_n_o")
+    if not el or not el.get("value"):
+        raise ValueError("e_s_n_o token not found")
+    return el["value"]
+
+
+def parse_comments(data: dict) -> list[Comment]:
+    out = []
+    for c in data.get("comments") or []:
+        no = parse_int(str(c.get("no", "")))
+        # 삭제된 댓글 / 댓글돌이(광고) 제외
+        if not no or str(c.get("is_delete", "0")) != "0" or c.get("nicktype") == "COMMENT_BOY":
+            continue
+        # memo는 HTML (디시콘은 img만 있어 본문이 빈 문자열이 됨)
+        body = clean_text(BeautifulSoup(c.get("memo") or "", "lxml").get_text(" ", strip=True))
+        out.append(
+            Comment(
+                no=no,
+                parent=parse_int(str(c.get("parent") or "")),
+                author=clean_text(c.get("name") or ""),
+                body=body,
+                created_at=c.get("reg_date") or "",
+            )
+        )
+    return out
+
+
+def _post(session: requests.Session, form: dict, referer: str) -> dict:
+    headers = dict(HEADERS, Referer=referer, **{"X-Requested-With": "XMLHttpRequest"})
+    for attempt in range(COMMENT_RETRIES + 1):
+        r = session.post(COMMENT_URL, data=form, headers=headers, timeout=15)
+        if (r.status_code == 429 or r.status_code >= 500) and attempt < COMMENT_RETRIES:
+            time.sleep(retry_after(r, 2.0 ** attempt))
+            continue
+        r.raise_for_status()
+        return r.json() if r.text.strip() else {}
+    return {}
+
+
+def fetch_new_comments(session: requests.Session, token: str, t: Target) -> tuple[list[Comment], int, bool]:
+    """워터마크(last_cmt_no)보다 새 댓글만 받는다. (새 댓글, 서버가 알려준 전체 댓글 수, 끝까지 받았는지)
+
+    최신순으로 받아 워터마크 이하 번호가 보이면 멈추므로 요청 수는 새 댓글 수에 비례한다.
+    MAX_PAGES에서 끊기면 워터마크까지 못 닿은 것이라 complete=False (사이 댓글이 빠져 있음).
+    """
+    gallery = dict(parse_qsl(urlsplit(t.url).query)).get("id", "")
+    new: list[Comment] = []
+    total = 0
+    for page in range(1, MAX_PAGES + 1):
+        data = _post(
+            session,
+            {
+                "id": gallery,
+                "no": t.post_no,
+                "cmt_id": gallery,
+                "cmt_no": t.post_no,
+                "e_s_n_o": token,
+                "comment_page": page,
+                "sort": "N",  # 최신순
+                "_GALLTYPE_": "M",
+            },
+            t.url,
+        )
+        # e_s_n_o가 틀렸거나 글이 지워지면 200에 빈 본문이 온다. 댓글 0개로 보고 워터마크를 넘기면 다시 시도되지 않으므로 실패로 처리
+        if not isinstance(data, dict) or "comments" not in data or "total_cnt" not in data:
+            raise ValueError("comment response without comments/total_cnt (bad e_s_n_o or deleted post)")
+        total = max(total, parse_int(str(data.get("total_cnt", ""))) or 0)
+        raw = data.get("comments") or []
+        items = parse_comments(data)
+        fresh = [c for c in items if c.no > t.last_cmt_no]
+        new.extend(fresh)
+        # 빈 페이지이거나 이미 받은 댓글에 닿았으면 끝
+        if not raw or len(fresh) < len(items) or (total and len(new) >= total):
+            return new, total, True
+    return new, total, False
+
+
+def save_comments(conn: sqlite3.Connection, results: list[tuple[Target, list[Comment], int, bool]]) -> int:
+    """새 댓글 저장 + 워터마크 갱신을 한 트랜잭션으로.
+
+    끝까지 받지 못한 글(complete=False)은 받은 댓글만 저장하고 워터마크는 그대로 둬 다음 실행에서 다시 본다.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    before = conn.total_changes
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO comments (post_no, cmt_no, parent_no, author, body, created_at, fetched_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (t.post_no, c.no, c.parent, c.author or None, c.body, c.created_at, now)
+            # 글 본문처럼 텍스트만 쓰므로 디시콘만 있는 댓글은 버림 (워터마크는 넘어감)
+            for t, comments, _, _ in results for c in comments if c.body
+        ],
+    )
+    saved = conn.total_changes - before
+    conn.executemany(
+        """
+        INSERT INTO comment_state (post_no, seen, last_cmt_no, checked_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(post_no) DO UPDATE SET
+          seen = excluded.seen,
+          last_cmt_no = MAX(last_cmt_no, excluded.last_cmt_no),
+          checked_at = excluded.checked_at
+        """,
+        [
+            (t.post_no, max(t.listed, total), max([t.last_cmt_no] + [c.no for c in comments]), now)
+            for t, comments, total, complete in results
+            if complete
+        ],
+    )
+    conn.commit()
+    return saved
+
+
+def collect(
+    conn: sqlite3.Connection,
+    session: requests.Session,
+    hours: int = RECENT_HOURS,
+    max_posts: Optional[int] = None,
+    delay: float = 1.0,
+) -> tuple[int, int, int]:
+    """(확인한 글 수, 저장한 댓글 수, 실패한 글 수). 실패한 글은 워터마크가 그대로라 다음 실행에서 다시 시도된다."""
+    targets = pending_posts(conn, hours, max_posts)
+    if not targets:
+        return 0, 0, 0
+    token = esno_token(session)
+
+    checked = saved = failed = 0
+    for i in range(0, len(targets), BATCH):
+        results = []
+        for t in targets[i : i + BATCH]:
+            try:
+                comments, total, complete = fetch_new_comments(session, token, t)
+                results.append((t, comments, total, complete))
+                checked += 1
+                if not complete:
+                    print(f"[WARN] post_no={t.post_no}: {MAX_PAGES} pages without reaching the watermark, kept for retry")
+            except Exception as e:
+                failed += 1
+                print(f"[ERROR] {type(e).__name__}: {e} (post_no={t.post_no})")
+            time.sleep(delay)  # 요청 간격(차단 방지)
+        saved += save_comments(conn, results)
+        print(f"[BATCH] {min(i + BATCH, len(targets))}/{len(targets)} posts, comments saved={saved}")
+    return checked, saved, failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="최근 글의 새 댓글만 수집 → comments 저장 + 분류/집계")
+    ap.add_argument("--hours", type=int, default=RECENT_HOURS, help="최근 N시간 안에 리스트에서 본 글만 대상")
+    ap.add_argument("--max-posts", type=int, help="이번 실행에서 확인할 최대 글 수")
+    ap.add_argument("--delay", type=float, default=1.0, help="요청 간격(초)")
+    args = ap.parse_args()
+
+    with requests.Session() as session, connect(DB_PATH) as conn:
+        checked, saved, failed = collect(conn, session, args.hours, args.max_posts, args.delay)
+        classified = classify_new_comments(conn)
+        total = conn.execute("SELECT COUNT(*) FROM comments").fetchone()[0]
+
+    print(f"\n[SUMMARY] posts checked={checked}, comments saved={saved}, failed={failed}, classified={classified}")
+    print(f"[DB] comments total={total} ({DB_PATH})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,76 @@
 from __future__ import annotations
 
+import argparse
+import os
+import re
+import sqlite3
 import time
-from pathlib import Path
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
 from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
 
 import requests
 from bs4 import BeautifulSoup
 
+from aggregates import record_snapshots, sync_weights
+from crawl_queue import enqueue
+from storage import DB_PATH, connect, post_no_from_url
 
-BASE = "https://gall.dcinside.com"
-LIST_URL = "https://gall.dcinside.com/mgallery/board/lists/?id=com2usbaseball&page=1"
 
-OUT_PATH = Path(__file__).resolve().parents[1] / "data" / "list_urls.txt"
+# 로컬 목 서버(mock_dc.py)로 돌릴 때: VOC_BASE_URL=http://127.0.0.1:8765
+BASE = os.environ.get("VOC_BASE_URL", "https://gall.dcinside.com").rstrip("/")
+LIST_URL = BASE + "/mgallery/board/lists/?id=com2usbaseball&page={page}"
 
+# DB와 같은 폴더 (VOC_DB_PATH로 DB를 옮기면 같이 따라감)
+OUT_PATH = DB_PATH.parent / "list_urls.txt"
 
-def main():
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        ),
-        "Accept-Language": "ko-KR,ko;q=0.9,en;q=0.8",
-    }
+# 리스트 페이지 429/5xx 재시도 횟수 (Retry-After가 있으면 그만큼 기다림)
+LIST_RETRIES = 3
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "ko-KR,ko;q=0.9,en;q=0.8",
+}
+
+
+@dataclass
+class ListRow:
+    url: str
+    post_no: int
+    title: str
+    author: str
+    created_at: str
+    views: Optional[int] = None
+    upvotes: Optional[int] = None
+    comments: Optional[int] = None
+
+
+def parse_int(s: str) -> Optional[int]:
+    if not s:
+        return None
+    s = re.sub(r"[^\d]", "", s)
+    return int(s) if s else None
+
+
+def clean_url(href: str) -> str:
+    full = urljoin(BASE, href)
 
-    r = requests.get(LIST_URL, headers=headers, timeout=15)
-    r.raise_for_status()
+    # 같은 글 중복 방지: t=cv 같은 파라미터 제거하고 id/no/page만 남김
+    sp = urlsplit(full)
+    q = dict(parse_qsl(sp.query, keep_blank_values=True))
+    keep = {k: q[k] for k in ["id", "no", "page"] if k in q}
+    clean_query = urlencode(keep)
+    return urlunsplit((sp.scheme, sp.netloc, sp.path, clean_query, ""))
 
-    soup = BeautifulSoup(r.text, "lxml")
 
-    # 글 링크는 보통 /mgallery/board/view/?id=...&no=... 형태로 들어있음
-    urls = []
+def parse_list_page(html: str) -> list[ListRow]:
+    soup = BeautifulSoup(html, "lxml")
+    rows: list[ListRow] = []
 
     # 디시 목록은 보통 글 1개 = tr 1개
     for tr in soup.select("tr.ub-content.us-post"):
@@ -42,6 +82,7 @@ def main():
         if subj in ("공지", "AD", "설문", "갤클"):
             continue
 
+        # 글 링크는 보통 /mgallery/board/view/?id=...&no=... 형태로 들어있음
         a = tr.select_one('a[href*="/mgallery/board/view/"]')
         if not a:
             continue
@@ -50,34 +91,143 @@ def main():
         if not href:
             continue
 
-        full = urljoin(BASE, href)
+        url = clean_url(href)
+        post_no = parse_int(tr.get("data-no", "")) or post_no_from_url(url)
+        if not post_no:
+            continue
+
+        # 댓글 수는 제목 옆 [N] 표시
+        reply_el = tr.select_one("span.reply_num")
+        writer_el = tr.select_one("td.gall_writer")
+        date_el = tr.select_one("td.gall_date")
+        views_el = tr.select_one("td.gall_count")
+        up_el = tr.select_one("td.gall_recommend")
+
+        author = ""
+        if writer_el:
+            author = writer_el.get("data-nick") or writer_el.get_text(" ", strip=True)
+        # 날짜 칸은 오늘 글이면 시:분만 보여주고, title 속성에 전체 시각이 들어있음
+        created_at = ""
+        if date_el:
+            created_at = date_el.get("title") or date_el.get_text(strip=True)
+
+        rows.append(
+            ListRow(
+                url=url,
+                post_no=post_no,
+                title=a.get_text(" ", strip=True),
+                author=author.strip(),
+                created_at=created_at.strip(),
+                views=parse_int(views_el.get_text(strip=True)) if views_el else None,
+                upvotes=parse_int(up_el.get_text(strip=True)) if up_el else None,
+                comments=parse_int(reply_el.get_text(strip=True)) if reply_el else 0,
+            )
+        )
+    return rows
+
+
+def retry_after(r: requests.Response, default: float) -> float:
+    """Retry-After 헤더(초)를 읽는다. 없거나 날짜 형식이면 default."""
+    try:
+        return max(float(r.headers.get("Retry-After", "")), 0.0)
+    except ValueError:
+        return default
+
+
+def fetch_list_page(session: requests.Session, page: int) -> list[ListRow]:
+    for attempt in range(LIST_RETRIES + 1):
+        r = session.get(LIST_URL.format(page=page), headers=HEADERS, timeout=15)
+        if (r.status_code == 429 or r.status_code >= 500) and attempt < LIST_RETRIES:
+            time.sleep(retry_after(r, 2.0 ** attempt))
+            continue
+        r.raise_for_status()
+        return parse_list_page(r.text)
+    return []
+
+
+def save_list_rows(conn: sqlite3.Connection, rows: list[ListRow]) -> int:
+    """list_meta를 글 번호 기준으로 upsert하고, 이미 상세 수집된 글은 posts의 조회/추천/댓글 수를 한 번에 갱신한다.
+
+    매 호출마다 post_metrics_snapshot에 한 줄씩 남긴다.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    conn.executemany(
+        """
+        INSERT INTO list_meta (post_no, url, title, author, created_at, views, upvotes, comments, seen_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(post_no) DO UPDATE SET
+          title = excluded.title,
+          views = COALESCE(excluded.views, views),
+          upvotes = COALESCE(excluded.upvotes, upvotes),
+          comments = COALESCE(excluded.comments, comments),
+          seen_at = excluded.seen_at
+        """,
+        [(r.post_no, r.url, r.title, r.author, r.created_at, r.views, r.upvotes, r.comments, now) for r in rows],
+    )
+    cur = conn.executemany(
+        """
+        UPDATE posts
+        SET views = COALESCE(?, views), upvotes = COALESCE(?, upvotes), comments = COALESCE(?, comments),
+            author = COALESCE(author, ?), metrics_at = ?
+        WHERE post_no = ?
+        """,
+        [(r.views, r.upvotes, r.comments, r.author, now, r.post_no) for r in rows],
+    )
+    updated = cur.rowcount
+    record_snapshots(conn, [(r.post_no, r.views, r.upvotes, r.comments) for r in rows], ts=now)
+    conn.commit()
+    # 수치가 바뀐 글의 가중치 차이만 일자/토픽 집계에 반영
+    sync_weights(conn, [r.post_no for r in rows])
+    return updated
+
+
+def crawl(pages: int, delay: float = 1.0) -> list[ListRow]:
+    session = requests.Session()
+    rows: list[ListRow] = []
+    seen = set()
+    for page in range(1, pages + 1):
+        for r in fetch_list_page(session, page):
+            # 페이지가 넘어가는 사이 새 글이 올라오면 같은 글이 두 페이지에 걸쳐 보일 수 있음
+            if r.post_no not in seen:
+                seen.add(r.post_no)
+                rows.append(r)
+        # 예의상 (다음 단계에서 상세 수집 때 더 중요)
+        time.sleep(delay)
+    return rows
+
 
-        # 같은 글 중복 방지: t=cv 같은 파라미터 제거하고 id/no/page만 남김
-        sp = urlsplit(full)
-        q = dict(parse_qsl(sp.query, keep_blank_values=True))
-        keep = {k: q[k] for k in ["id", "no", "page"] if k in q}
-        clean_query = urlencode(keep)
-        full = urlunsplit((sp.scheme, sp.netloc, sp.path, clean_query, ""))
+def main():
+    ap = argparse.ArgumentParser(description="최신 글 URL + 리스트 메타데이터(조회/추천/댓글) 수집")
+    ap.add_argument("--pages", type=int, default=1, help="읽을 리스트 페이지 수")
+    ap.add_argument("--top", type=int, default=30, help="list_urls.txt에 남길 최신 글 수")
+    ap.add_argument("--refresh", action="store_true",
+                    help="URL 목록은 건드리지 않고 최근 글의 조회/추천/댓글 수만 일괄 갱신")
+    args = ap.parse_args()
+
+    rows = crawl(args.pages)
 
-        if full not in urls:
-            urls.append(full)
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with connect(DB_PATH) as conn:
+        updated = save_list_rows(conn, rows)
 
-    # 상위 30개만
-    urls = urls[:30]
+    if args.refresh:
+        print(f"[OK] refreshed metrics: list rows={len(rows)}, posts updated={updated}")
+        return
+
+    # 상위 N개만
+    urls = [r.url for r in rows][: args.top]
 
-    OUT_PATH.parent.mkdir(exist_ok=True)
     OUT_PATH.write_text("\n".join(urls) + ("\n" if urls else ""), encoding="utf-8")
+    with connect(DB_PATH) as conn:
+        queued = enqueue(conn, urls)
 
-    print(f"[OK] total found: {len(urls)}")
+    print(f"[OK] total found: {len(urls)} (list rows={len(rows)}, posts updated={updated}, queued={queued})")
     print(f"[OK] saved to: {OUT_PATH}")
     if urls:
         print("[SAMPLE]")
         for u in urls[:5]:
             print(" -", u)
 
-    # 예의상 (다음 단계에서 상세 수집 때 더 중요)
-    time.sleep(1.0)
-
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,21 +1,26 @@
 from __future__ import annotations
 
+import argparse
 import re
 import sqlite3
 import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from pathlib import Path
 from typing import Optional
 from urllib.parse import urlsplit, parse_qsl
 
 import requests
 from bs4 import BeautifulSoup
 
+from aggregates import classify_new_posts, record_snapshots
+from classifier import update_if_enabled
+from crawl_queue import claim, complete, enqueue, fail, stats, worker_id
+from fetch_list import BASE, retry_after
+from storage import DB_PATH, connect, post_no_from_url, save_body
 
-BASE_DIR = Path(__file__).resolve().parents[1]
-DB_PATH = BASE_DIR / "data" / "voc.db"
-URL_LIST_PATH = BASE_DIR / "data" / "list_urls.txt"
+
+URL_LIST_PATH = DB_PATH.parent / "list_urls.txt"
 
 
 @dataclass
@@ -26,24 +31,8 @@ class Post:
     body: str
     views: Optional[int] = None
     upvotes: Optional[int] = None
-
-
-def init_db(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS posts (
-          id INTEGER PRIMARY KEY AUTOINCREMENT,
-          url TEXT UNIQUE,
-          created_at TEXT,
-          title TEXT,
-          body TEXT,
-          views INTEGER,
-          upvotes INTEGER,
-          fetched_at TEXT
-        );
-        """
-    )
-    conn.commit()
+    comments: Optional[int] = None
+    author: str = ""
 
 
 def clean_text(s: str) -> str:
@@ -66,7 +55,7 @@ def fetch_one(url: str, session: requests.Session) -> Optional[Post]:
             "Chrome/120.0.0.0 Safari/537.36"
         ),
         "Accept-Language": "ko-KR,ko;q=0.9,en;q=0.8",
-        "Referer": "https://gall.dcinside.com/",
+        "Referer": BASE + "/",
     }
 
     r = session.get(url, headers=headers, timeout=15)
@@ -93,12 +82,11 @@ def fetch_one(url: str, session: requests.Session) -> Optional[Post]:
     time_el = soup.select_one(".gall_date") or soup.select_one("span.gall_date")
     created_at = clean_text(time_el.get_text(" ", strip=True)) if time_el else ""
 
-    # 조회/추천(있으면)
+    # 조회(있으면)
     views_el = soup.select_one(".gall_count") or soup.select_one("span.gall_count")
-    up_el = soup.select_one(".gall_reply_num")  # 추천은 페이지마다 다를 수 있어 일단 비워둠
 
     views = parse_int(views_el.get_text(" ", strip=True)) if views_el else None
-    upvotes = None  # 추천 selector는 다음 단계에서 확인 후 추가
+    upvotes = None  # 추천/댓글 수는 리스트 페이지(list_meta)에서 채움
 
     # created_at이 비었으면 URL 파라미터에서라도 보정할 수 없으니 fetched_at로만 남겨도 OK
     if not created_at:
@@ -107,62 +95,150 @@ def fetch_one(url: str, session: requests.Session) -> Optional[Post]:
     return Post(url=url, created_at=created_at, title=title, body=body, views=views, upvotes=upvotes)
 
 
+def merge_list_meta(conn: sqlite3.Connection, p: Post, post_no: Optional[int]) -> None:
+    """리스트 페이지에서 이미 읽어둔 추천/댓글/작성자 값으로 상세 페이지의 빈 칸을 채운다."""
+    if post_no is None:
+        return
+    row = conn.execute(
+        "SELECT views, upvotes, comments, author, created_at FROM list_meta WHERE post_no = ?",
+        (post_no,),
+    ).fetchone()
+    if not row:
+        return
+    views, upvotes, comments, author, created_at = row
+    p.views = p.views if p.views is not None else views
+    p.upvotes = p.upvotes if p.upvotes is not None else upvotes
+    p.comments = p.comments if p.comments is not None else comments
+    p.author = p.author or author or ""
+    p.created_at = p.created_at or created_at or ""
+
+
 def save_post(conn: sqlite3.Connection, p: Post) -> bool:
     now = datetime.now().isoformat(timespec="seconds")
+    post_no = post_no_from_url(p.url)
+    merge_list_meta(conn, p, post_no)
     try:
-        conn.execute(
+        cur = conn.execute(
             """
-            INSERT INTO posts (url, created_at, title, body, views, upvotes, fetched_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO posts (url, post_no, created_at, title, views, upvotes, comments, author, fetched_at, metrics_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (p.url, p.created_at, p.title, p.body, p.views, p.upvotes, now),
+            (p.url, post_no, p.created_at, p.title, p.views, p.upvotes, p.comments, p.author or None, now, now),
         )
+        save_body(conn, cur.lastrowid, p.body)
+        record_snapshots(conn, [(post_no, p.views, p.upvotes, p.comments)], ts=now)
         conn.commit()
         return True
     except sqlite3.IntegrityError:
-        # 이미 저장됨(url UNIQUE)
+        # 이미 저장됨(url / post_no UNIQUE)
+        conn.rollback()
         return False
+    except Exception:
+        # 본문/스냅샷 저장이 실패하면 글 행도 남기지 않음 (본문 없는 글이 저장된 것으로 보이지 않게)
+        conn.rollback()
+        raise
 
 
-def main():
-    if not URL_LIST_PATH.exists():
-        raise FileNotFoundError(f"Missing {URL_LIST_PATH}. Run fetch_list.py first.")
+def is_saved(conn: sqlite3.Connection, url: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM posts WHERE url = ? OR post_no = ? LIMIT 1", (url, post_no_from_url(url))
+    ).fetchone()
+    return row is not None
 
-    urls = [line.strip() for line in URL_LIST_PATH.read_text(encoding="utf-8").splitlines() if line.strip()]
-    if not urls:
-        print("[WARN] No URLs in list_urls.txt")
-        return
 
-    DB_PATH.parent.mkdir(exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
-        init_db(conn)
+def work(delay: float = 1.5, max_items: Optional[int] = None, tag: str = "") -> tuple[int, int, int, int]:
+    """큐에서 하나씩 가져와 상세 수집. 큐가 비면(또는 max_items개 처리하면) 끝난다.
+
+    여러 프로세스에서 동시에 돌려도 claim()이 같은 글을 두 번 주지 않는다.
+    """
+    who = worker_id()
+    ok, skipped, retried, failed = 0, 0, 0, 0
 
+    with connect(DB_PATH) as conn:
         session = requests.Session()
-        ok, skipped, failed = 0, 0, 0
+        i = 0
+        while max_items is None or i < max_items:
+            item = claim(conn, who)
+            if not item:
+                break
+            i += 1
+
+            # 이미 저장된 글은 상세 페이지를 다시 받지 않음 (조회/추천/댓글은 fetch_list가 갱신)
+            if is_saved(conn, item.url):
+                complete(conn, item)
+                skipped += 1
+                print(f"[{tag}{i:03d}] SKIP exists")
+                continue
 
-        for i, url in enumerate(urls, start=1):
             try:
-                post = fetch_one(url, session)
+                post = fetch_one(item.url, session)
                 if not post:
-                    failed += 1
-                    print(f"[{i:03d}] FAIL parse: {url}")
+                    raise ValueError("parse failed (title/body selector)")
+                saved = save_post(conn, post)
+                complete(conn, item)
+                if saved:
+                    ok += 1
+                    print(f"[{tag}{i:03d}] OK saved: {post.title[:30]}...")
                 else:
-                    inserted = save_post(conn, post)
-                    if inserted:
-                        ok += 1
-                        print(f"[{i:03d}] OK saved: {post.title[:30]}...")
-                    else:
-                        skipped += 1
-                        print(f"[{i:03d}] SKIP exists")
+                    skipped += 1
+                    print(f"[{tag}{i:03d}] SKIP exists")
             except Exception as e:
-                failed += 1
-                print(f"[{i:03d}] ERROR {type(e).__name__}: {e}")
+                # 429는 서버가 알려준 시간만큼만 쉬고 다시 시도 (지수 backoff 대신)
+                wait = None
+                if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code == 429:
+                    wait = retry_after(e.response, 0.0) or None
+                state = fail(conn, item, f"{type(e).__name__}: {e}", wait)
+                if state == "failed":
+                    failed += 1
+                else:
+                    retried += 1
+                print(f"[{tag}{i:03d}] ERROR {type(e).__name__}: {e} -> {state} (attempt {item.attempts}): {item.url}")
+
+            time.sleep(delay)  # 요청 간격(차단 방지)
+
+    return ok, skipped, retried, failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="crawl_queue의 글 상세 수집 → DB 저장")
+    ap.add_argument("--workers", type=int, default=1, help="동시에 돌릴 워커 프로세스 수")
+    ap.add_argument("--delay", type=float, default=1.5, help="워커별 요청 간격(초)")
+    ap.add_argument("--max", type=int, help="워커별 최대 처리 개수")
+    args = ap.parse_args()
+
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with connect(DB_PATH) as conn:
+        # 예전 흐름 호환: list_urls.txt에 있는 URL도 큐에 넣음 (이미 있으면 무시)
+        if URL_LIST_PATH.exists():
+            urls = [line.strip() for line in URL_LIST_PATH.read_text(encoding="utf-8").splitlines() if line.strip()]
+            enqueue(conn, urls)
+        queue = stats(conn)
+        pending = queue.get("pending", 0) + queue.get("running", 0)
+    if not pending:
+        print("[WARN] crawl_queue is empty. Run fetch_list.py first.")
+        return
+
+    if args.workers <= 1:
+        results = [work(args.delay, args.max)]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as ex:
+            futs = [ex.submit(work, args.delay, args.max, f"w{n} ") for n in range(1, args.workers + 1)]
+            results = [f.result() for f in futs]
+
+    ok, skipped, retried, failed = (sum(r[k] for r in results) for k in range(4))
 
-            time.sleep(1.5)  # 요청 간격(차단 방지)
+    with connect(DB_PATH) as conn:
+        classified = classify_new_posts(conn)
+        # 분류기를 한 번 학습해 둔 경우에만 새 글로 이어서 학습
+        trained = update_if_enabled(conn)
+        queue = stats(conn)
 
-        print(f"\n[SUMMARY] saved={ok}, skipped={skipped}, failed={failed}")
-        print(f"[DB] {DB_PATH}")
+    print(f"\n[SUMMARY] saved={ok}, skipped={skipped}, retry={retried}, failed={failed}, classified={classified}")
+    if trained is not None:
+        print(f"[MODEL] trained on {trained} new posts")
+    print(f"[QUEUE] {queue}")
+    print(f"[DB] {DB_PATH}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import argparse
 import sqlite3
-from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
+from typing import Iterable, Iterator
 
-from keywords import TOPICS, NEG_WORDS
+from aggregates import engagement_score, velocity
+from analyze import upsert_section
+from pipeline import Scored, Window, add_window_args, classify, iter_posts, top_k, window_from_args
+from storage import DB_PATH, connect
 
 QUICK_ACTION = {
     "T4_버그/서버": "장애 공지 템플릿 적용 + 발생 시간대/OS 로그 확인 + 보상 기준 안내",
@@ -21,61 +25,20 @@ QUICK_ACTION = {
 
 
 BASE = Path(__file__).resolve().parents[1]
-DB_PATH = BASE / "data" / "voc.db"
 REPORT_PATH = BASE / "reports" / f"{date.today().isoformat()}.md"
 
 
-@dataclass
-class Post:
-    url: str
-    title: str
-    body: str
-    fetched_at: str
-
-
-def score_topic(text: str) -> tuple[str, int]:
-    best_topic = "OTHER"
-    best_score = 0
-    for topic, kws in TOPICS.items():
-        s = 0
-        for kw in kws:
-            if kw in text:
-                s += 1
-        if s > best_score:
-            best_topic, best_score = topic, s
-    return best_topic, best_score
-
-
-def is_negative(text: str) -> bool:
-    return any(w in text for w in NEG_WORDS)
-
-
-def upsert_section(md: str, header: str, content: str) -> str:
-    if header not in md:
-        return md.rstrip() + "\n\n" + header + "\n\n" + content
-
-    before, rest = md.split(header, 1)
-    rest = rest.lstrip("\n")
-    idx = rest.find("\n## ")
-    if idx == -1:
-        new_rest = "\n" + content
-    else:
-        new_rest = "\n" + content + "\n" + rest[idx + 1 :]
-    return before.rstrip() + "\n\n" + header + new_rest
-
-
-def highlight_score(p: Post) -> tuple[int, int, int]:
+def highlight_score(s: Scored) -> tuple[int, int, int, int]:
     """
     정렬용 점수(큰 게 우선):
     1) 부정/이슈 우선
     2) 토픽 매칭 강도(키워드 히트 수)
     3) 본문 길이(너무 짧은 글 배제)
     """
-    text = f"{p.title} {p.body}".strip()
-    topic, topic_hits = score_topic(text)
+    topic, topic_hits = s.topic, s.hits
 
-    neg = 1 if is_negative(text) else 0
-    length = len(p.body or "")
+    neg = 1 if s.neg else 0
+    length = len(s.post.body or "")
 
     # 운영 중요 토픽 가중치(원하면 조정)
     weight = 0
@@ -86,49 +49,58 @@ def highlight_score(p: Post) -> tuple[int, int, int]:
     return (neg, weight, topic_hits, length)
 
 
+def weighted_highlight_score(s: Scored, vel: dict[int, tuple[float, float]]) -> tuple[int, int, float, int]:
+    """
+    참여도 가중 모드: 토픽 히트 수 대신 (히트 수 × 참여도 점수)로 비교.
+    참여도 점수 = 조회/추천/댓글 누적 + 최근 속도(시간당 증가량) 보너스
+    """
+    neg, weight, topic_hits, length = highlight_score(s)
+    p = s.post
+    eng = engagement_score(p.views, p.upvotes, p.comments, vel.get(p.post_no))
+    return (neg, weight, round(topic_hits * eng, 3), length)
+
+
+def candidates(scored: Iterable[Scored]) -> Iterator[Scored]:
+    for s in scored:
+        # 너무 짧은 글은 하이라이트에서 제외(노이즈 방지)
+        if len((s.post.title + s.post.body).strip()) < 20:
+            continue
+        # 토픽 히트가 너무 낮은 글(애매한 글)은 하이라이트에서 제외
+        if s.hits < 2:   # <- 여기 숫자만 조절하면 됨(2 추천)
+            continue
+        yield s
+
+
+def rank_highlights(conn: sqlite3.Connection, window: Window, weighted: bool = False, k: int = 3) -> list[Scored]:
+    key = highlight_score
+    if weighted:
+        vel = velocity(conn)
+        key = lambda s: weighted_highlight_score(s, vel)  # noqa: E731
+    return top_k(candidates(classify(iter_posts(conn, window))), k, key=key)
+
+
+def render_highlights(ranked: list[Scored]) -> str:
+    if not ranked:
+        return "- 오늘 신규 수집 글이 없습니다.\n"
+    lines = []
+    for i, s in enumerate(ranked, start=1):
+        neg_tag = "🔥" if s.neg else ""
+        action = QUICK_ACTION.get(s.topic, "—")
+        lines.append(f"{i}) [{s.topic}]{neg_tag} {s.post.title} ({s.post.url})\n   - Quick Action: {action}")
+    return "\n".join(lines) + "\n"
+
+
 def main():
-    today = date.today().isoformat()
-
-    with sqlite3.connect(DB_PATH) as conn:
-        rows = conn.execute(
-            """
-            SELECT url, title, body, fetched_at
-            FROM posts
-            WHERE date(fetched_at) = ?
-            ORDER BY id DESC
-            """,
-            (today,),
-        ).fetchall()
-
-    posts = [Post(url=r[0], title=r[1] or "", body=r[2] or "", fetched_at=r[3] or "") for r in rows]
-
-    # 너무 짧은 글은 하이라이트에서 제외(노이즈 방지)
-    posts = [p for p in posts if len((p.title + p.body).strip()) >= 20]
-
-    # 토픽 히트가 너무 낮은 글(애매한 글)은 하이라이트에서 제외
-    filtered = []
-    for p in posts:
-        text = f"{p.title} {p.body}".strip()
-        topic, hits = score_topic(text)
-        if hits >= 2:   # <- 여기 숫자만 조절하면 됨(2 추천)
-            filtered.append(p)
-    posts = filtered
-
-    if not posts:
-        content = "- 오늘 신규 수집 글이 없습니다.\n"
-    else:
-        ranked = sorted(posts, key=highlight_score, reverse=True)[:3]
-
-        lines = []
-        for i, p in enumerate(ranked, start=1):
-            text = f"{p.title} {p.body}".strip()
-            topic, hits = score_topic(text)
-            if hits == 0:
-                topic = "OTHER"
-            neg_tag = "🔥" if is_negative(text) else ""
-            action = QUICK_ACTION.get(topic, "—")
-            lines.append(f"{i}) [{topic}]{neg_tag} {p.title} ({p.url})\n   - Quick Action: {action}")
-        content = "\n".join(lines) + "\n"
+    ap = argparse.ArgumentParser(description="오늘 신규 글 하이라이트 TOP3")
+    add_window_args(ap, default="day")
+    ap.add_argument("--weighted", action="store_true", help="조회/추천/댓글 참여도와 속도를 반영해 순위")
+    args = ap.parse_args()
+    window = window_from_args(args)
+
+    with connect(DB_PATH) as conn:
+        ranked = rank_highlights(conn, window, args.weighted)
+
+    content = render_highlights(ranked)
 
     md = REPORT_PATH.read_text(encoding="utf-8") if REPORT_PATH.exists() else ""
     md = upsert_section(md, "## 오늘 신규 글 하이라이트 (TOP3)", content)
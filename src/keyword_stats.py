@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from collections import Counter, defaultdict
+
+from aggregates import classify_new_posts, window_aggregate
+from keywords import TOPICS, NEG_WORDS
+from pipeline import ALL_KEYWORDS, Window
+from storage import DB_PATH, connect
+
+
+NEG = "NEG"
+
+
+def owners() -> dict[str, set[str]]:
+    """키워드 → 그 키워드가 정의된 토픽들 (부정 키워드는 NEG)."""
+    own: dict[str, set[str]] = defaultdict(set)
+    for topic, kws in TOPICS.items():
+        for kw in kws:
+            own[kw].add(topic)
+    for kw in NEG_WORDS:
+        own[kw].add(NEG)
+    return own
+
+
+def nested_keywords() -> list[tuple[str, str]]:
+    """다른 키워드의 부분 문자열인 키워드 쌍 (짧은 쪽은 긴 쪽이 걸릴 때 항상 같이 걸림)."""
+    pairs = []
+    for short in ALL_KEYWORDS:
+        for long in ALL_KEYWORDS:
+            if short != long and short in long:
+                pairs.append((short, long))
+    return pairs
+
+
+def load_hits(conn: sqlite3.Connection, window: Window) -> dict[str, Counter]:
+    where, params = [], []
+    if window.since:
+        where.append("day >= ?")
+        params.append(window.since)
+    if window.until:
+        where.append("day <= ?")
+        params.append(window.until)
+    sql = "SELECT keyword, topic, SUM(hits) FROM keyword_daily_hits"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY keyword, topic"
+
+    hits: dict[str, Counter] = defaultdict(Counter)
+    for kw, topic, n in conn.execute(sql, params):
+        hits[kw][topic] = n
+    return hits
+
+
+def main():
+    ap = argparse.ArgumentParser(description="키워드 적중 통계: 죽은 키워드 / 지배 키워드 / 토픽 겹침 키워드")
+    ap.add_argument("--since", help="시작일 YYYY-MM-DD (포함)")
+    ap.add_argument("--until", help="종료일 YYYY-MM-DD (포함)")
+    ap.add_argument("--top", type=int, default=15, help="지배 키워드 출력 개수")
+    ap.add_argument("--min-hits", type=int, default=5, help="겹침 판정 최소 적중 수")
+    ap.add_argument("--overlap", type=float, default=0.5, help="다른 토픽 글에서 걸린 비율 기준")
+    args = ap.parse_args()
+    window = Window(since=args.since, until=args.until)
+
+    with connect(DB_PATH) as conn:
+        classify_new_posts(conn)
+        agg = window_aggregate(conn, window)
+        hits = load_hits(conn, window)
+
+    total = agg.total
+    print(f"[RANGE] {window.label()} / posts={total}")
+    if total and not hits:
+        print("[WARN] 키워드 집계가 비어 있습니다. `python src/aggregates.py --rebuild`로 기존 글을 다시 분류하세요.")
+        return
+
+    own = owners()
+
+    # 1) 죽은 키워드: 기간 내 한 번도 안 걸림
+    dead: dict[str, list[str]] = defaultdict(list)
+    for kw in ALL_KEYWORDS:
+        if not hits.get(kw):
+            for o in sorted(own[kw]):
+                dead[o].append(kw)
+    print(f"\n[DEAD] 한 번도 걸리지 않은 키워드 ({sum(len(v) for v in dead.values())}개)")
+    for o in list(TOPICS) + [NEG]:
+        if dead.get(o):
+            print(f"- {o}: {', '.join(dead[o])}")
+
+    # 2) 지배 키워드: 적중 수 상위 + 자기 토픽 글에서의 점유율
+    ranked = sorted(((kw, sum(c.values())) for kw, c in hits.items()), key=lambda x: x[1], reverse=True)
+    print(f"\n[DOMINANT] 적중 상위 {args.top}")
+    for kw, n in ranked[: args.top]:
+        topics = sorted(own.get(kw, {"?"}))
+        own_topic_posts = sum(agg.topic_counts.get(t, 0) for t in topics if t != NEG)
+        in_own = sum(hits[kw].get(t, 0) for t in topics if t != NEG)
+        share = f", 자기 토픽 글의 {in_own / own_topic_posts:.0%}" if own_topic_posts else ""
+        print(f"- {kw} ({'/'.join(topics)}): {n} hits, 전체 글의 {n / total:.0%}{share}")
+
+    # 3) 토픽 겹침: 자기 토픽이 아닌 글에서 주로 걸리는 키워드 (오탐 후보)
+    print(f"\n[OVERLAP] 다른 토픽 글에서 {args.overlap:.0%} 이상 걸린 키워드 (hits ≥ {args.min_hits})")
+    rows = []
+    for kw, c in hits.items():
+        topics = own.get(kw, set()) - {NEG}
+        if not topics:
+            continue  # 부정 키워드는 원래 토픽 무관
+        n = sum(c.values())
+        off = n - sum(c.get(t, 0) for t in topics)
+        if n >= args.min_hits and off / n >= args.overlap:
+            rows.append((kw, topics, n, off, c))
+    rows.sort(key=lambda r: r[3], reverse=True)
+    for kw, topics, n, off, c in rows:
+        where = ", ".join(f"{t} {m}" for t, m in c.most_common(3) if t not in topics)
+        print(f"- {kw} ({'/'.join(sorted(topics))}): {off}/{n} ({off / n:.0%}) → {where}")
+    multi = ["{}({})".format(kw, "/".join(sorted(own[kw]))) for kw in ALL_KEYWORDS if len(own[kw]) > 1]
+    if multi:
+        print(f"- 여러 목록에 중복 정의: {', '.join(multi)}")
+
+    # 4) 포함 관계: 짧은 키워드는 긴 키워드와 항상 같이 걸려 히트 수를 부풀림
+    nested = nested_keywords()
+    if nested:
+        print("\n[NESTED] 다른 키워드에 포함되는 키워드")
+        for short, long in nested:
+            print(f"- '{short}' ⊂ '{long}' ({sum(hits.get(short, Counter()).values())} / {sum(hits.get(long, Counter()).values())} hits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import os
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from mock_dc import add_mock_args, config_from_args, start
+
+
+# 쓰기량을 비교할 테이블
+TABLES = ("posts", "post_bodies", "list_meta", "post_metrics_snapshot", "crawl_queue", "post_topic", "comments")
+
+
+def table_counts(conn: sqlite3.Connection) -> Counter:
+    return Counter({t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in TABLES})
+
+
+def _init_worker(backoff: float) -> None:
+    import crawl_queue
+
+    crawl_queue.BACKOFF_BASE_SEC = backoff
+
+
+def _work(delay: float) -> tuple[int, int, int, int]:
+    import fetch_posts
+
+    # 글마다 찍는 진행 로그는 부하 측정에 방해가 되어 끔
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return fetch_posts.work(delay)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="목 서버(mock_dc.py)를 상대로 fetch_list → fetch_posts 전체 흐름 부하 테스트")
+    ap.add_argument("--pages", type=int, default=10, help="읽을 목록 페이지 수")
+    ap.add_argument("--workers", type=int, default=4, help="fetch_posts 워커 프로세스 수")
+    ap.add_argument("--delay", type=float, default=0.0, help="워커별 요청 간격(초)")
+    ap.add_argument("--backoff", type=float, default=1.0,
+                    help="실패 재시도 backoff 기준(초). 실제 수집은 60초라 테스트에선 줄여서 씀")
+    ap.add_argument("--timeout", type=float, default=120.0, help="재시도 대기 포함 최대 실행 시간(초)")
+    ap.add_argument("--db", help="결과 DB 경로 (기본: 임시 디렉터리)")
+    ap.add_argument("--comment-wait", type=float, default=3.0,
+                    help="--comment-grow를 줬을 때 2차 댓글 수집 전에 기다릴 시간(초)")
+    add_mock_args(ap)
+    args = ap.parse_args()
+
+    srv = start(config_from_args(args))
+    db_path = Path(args.db) if args.db else Path(tempfile.mkdtemp(prefix="voc_load_")) / "voc.db"
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    # 크롤러 모듈은 import 시점에 주소/DB 경로를 읽으므로 환경 변수를 먼저 설정
+    os.environ["VOC_BASE_URL"] = srv.base_url
+    os.environ["VOC_DB_PATH"] = str(db_path)
+    _init_worker(args.backoff)
+
+    import requests
+
+    from aggregates import classify_new_comments, classify_new_posts
+    from crawl_queue import enqueue, stats
+    from fetch_comments import collect
+    from fetch_list import crawl, save_list_rows
+    from storage import connect
+
+    print(f"[LOAD] server={srv.base_url} db={db_path} workers={args.workers}")
+
+    with connect(db_path) as conn:
+        before = table_counts(conn)
+
+    # 1) 목록
+    t0 = time.perf_counter()
+    rows = crawl(args.pages, delay=0)
+    with connect(db_path) as conn:
+        save_list_rows(conn, rows)
+        queued = enqueue(conn, [r.url for r in rows])
+    t_list = time.perf_counter() - t0
+    print(f"[LIST] pages={args.pages} rows={len(rows)} queued={queued} in {t_list:.2f}s ({args.pages / t_list:.1f} pages/s)")
+
+    # 2) 상세: 큐가 빌 때까지 워커를 돌리고, backoff 중인 항목이 남으면 기다렸다가 다시
+    t1 = time.perf_counter()
+    totals = [0, 0, 0, 0]
+    rounds = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.backoff,)) as ex:
+        while True:
+            rounds += 1
+            for r in ex.map(_work, [args.delay] * args.workers):
+                totals = [a + b for a, b in zip(totals, r)]
+            with connect(db_path) as conn:
+                nxt = conn.execute("SELECT MIN(next_attempt_at) FROM crawl_queue WHERE state = 'pending'").fetchone()[0]
+            if nxt is None:
+                break
+            wait = (datetime.fromisoformat(nxt) - datetime.now()).total_seconds()
+            if time.perf_counter() - t1 + max(wait, 0) > args.timeout:
+                print(f"[WARN] timeout: 재시도 대기 항목이 남음 (next={nxt})")
+                break
+            time.sleep(max(wait, 0) + 0.05)
+    t_fetch = time.perf_counter() - t1
+
+    # 3) 분류/집계
+    t2 = time.perf_counter()
+    with connect(db_path) as conn:
+        classified = classify_new_posts(conn)
+    t_cls = time.perf_counter() - t2
+
+    # 4) 댓글: 1차는 새 글 전체, 2차는 목록 첫 페이지만 다시 읽고 그사이 늘어난 댓글만
+    comment_passes = []
+    session = requests.Session()
+    for n in range(2 if args.comment_grow else 1):
+        if n:
+            time.sleep(args.comment_wait)
+            with connect(db_path) as conn:
+                save_list_rows(conn, crawl(1, delay=0))
+        calls = sum(v for (kind, _), v in srv.hits.items() if kind == "comment")
+        t3 = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), connect(db_path) as conn:
+            checked, saved, _ = collect(conn, session, delay=args.delay)
+            classify_new_comments(conn)
+        calls = sum(v for (kind, _), v in srv.hits.items() if kind == "comment") - calls
+        comment_passes.append((checked, saved, calls, time.perf_counter() - t3))
+
+    with connect(db_path) as conn:
+        after = table_counts(conn)
+        queue = stats(conn)
+        attempts, retried_items = conn.execute(
+            "SELECT COALESCE(SUM(attempts), 0), COALESCE(SUM(attempts > 1), 0) FROM crawl_queue"
+        ).fetchone()
+        errors = Counter(
+            (e or "").split(":")[0]
+            for (e,) in conn.execute("SELECT last_error FROM crawl_queue WHERE last_error IS NOT NULL")
+        )
+    srv.shutdown()
+
+    ok, skipped, retried, failed = totals
+    written = after - before
+    print(f"[FETCH] saved={ok} skipped={skipped} retry={retried} failed={failed} rounds={rounds} in {t_fetch:.2f}s")
+    print(f"[RATE] {ok / t_fetch:.1f} posts/s end-to-end (list+fetch {ok / (t_list + t_fetch):.1f} posts/s)")
+    print(f"[RETRY] attempts={attempts} for {sum(queue.values())} items, items retried={retried_items}, open errors={dict(errors)}")
+    print(f"[QUEUE] {queue}")
+    print(f"[DB] rows written={sum(written.values())} ({sum(written.values()) / (t_list + t_fetch):.0f} rows/s) {dict(written)}")
+    print(f"[DB] classified={classified} in {t_cls:.2f}s, size={db_path.stat().st_size / 1e6:.1f} MB")
+    for n, (checked, saved, calls, t) in enumerate(comment_passes, start=1):
+        print(f"[COMMENTS] pass {n}: posts checked={checked} comments saved={saved} requests={calls} in {t:.2f}s")
+    server = Counter()
+    for (kind, status), n in srv.hits.items():
+        server[f"{kind}:{status}"] += n
+    print(f"[SERVER] {dict(sorted(server.items()))}")
+
+
+if __name__ == "__main__":
+    main()
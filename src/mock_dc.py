@@ -0,0 +1,416 @@
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from keywords import TOPICS, NEG_WORDS
+
+
+# 디시 갤러리 대역(로컬 부하 테스트용). 실제 사이트 대신 합성 글을 같은 마크업으로 내려준다.
+#   목록: /mgallery/board/lists/?id=...&page=N  (tr.ub-content.us-post)
+#   상세: /mgallery/board/view/?id=...&no=N    (.title_subject / .write_div / .gall_date / .gall_count)
+#   댓글: POST /board/comment/ (id, no, e_s_n_o, comment_page, sort=N 최신순) → JSON
+
+GALLERY_ID = "com2usbaseball"
+FIRST_NO = 100000
+# 목록/상세 페이지의 hidden input#e_s_n_o 값. 댓글 API가 이 값을 같이 받아야 응답함
+ESNO = "3eabc219ebdd65f5"
+
+FILLER = "오늘 진짜 이거 왜 그럼 아니 근데 그냥 ㅋㅋㅋ ㅠㅠ 이번 패치 후 너무 생각 좀 해라 게임 유저 점심 야구 경기".split()
+VOCAB = [kw for kws in TOPICS.values() for kw in kws] + NEG_WORDS + FILLER * 4
+
+
+@dataclass
+class MockConfig:
+    posts: int = 2000  # 시작 시점 글 수
+    per_page: int = 50
+    grow: float = 0.0  # 초당 새 글 수 (목록이 밀리면서 페이지 경계에 중복이 생김)
+    latency_ms: float = 0.0  # 응답 지연 평균
+    jitter_ms: float = 0.0  # 지연 ± 범위
+    error_rate: float = 0.0  # 500 응답 비율
+    throttle_rate: float = 0.0  # 무작위 429 비율
+    rate_limit: float = 0.0  # 초당 허용 요청 수 (넘으면 429), 0이면 제한 없음
+    retry_after: int = 1  # 429의 Retry-After(초)
+    layout: str = "default"  # default / alt / mixed
+    broken_rate: float = 0.0  # 상세 페이지에서 본문 칸이 빠지는 비율 (파싱 실패)
+    comment_grow: float = 0.0  # 초당 새 댓글 수 (시작 시점 첫 페이지 글들에 돌아가며 달림)
+    comment_page: int = 100  # 댓글 API 한 페이지 크기
+    seed: int = 1
+
+
+@dataclass
+class MockPost:
+    no: int
+    title: str
+    body: str
+    author: str
+    created_at: datetime
+    views: int
+    upvotes: int
+    comments: int
+
+
+@dataclass
+class MockComment:
+    no: int
+    parent: Optional[int]
+    author: str
+    memo: str
+    created_at: datetime
+
+
+class Corpus:
+    """글 번호만으로 같은 글이 다시 만들어지는 합성 코퍼스 (메모리에 글을 쌓아두지 않음)."""
+
+    def __init__(self, cfg: MockConfig):
+        self.cfg = cfg
+        self.started = time.time()
+        self.epoch = datetime.now()
+        # 새 댓글이 달리는 글: 시작 시점 첫 페이지 (글이 늘어나도 대상은 고정)
+        self.hot_top = FIRST_NO + cfg.posts - 1
+
+    def newest(self) -> int:
+        grown = int((time.time() - self.started) * self.cfg.grow)
+        return FIRST_NO + self.cfg.posts + grown - 1
+
+    def post(self, no: int) -> Optional[MockPost]:
+        if no < FIRST_NO or no > self.newest():
+            return None
+        rnd = random.Random(self.cfg.seed * 1_000_003 + no)
+        age = self.newest() - no
+        return MockPost(
+            no=no,
+            title=" ".join(rnd.choice(VOCAB) for _ in range(rnd.randint(2, 6))),
+            body=" ".join(rnd.choice(VOCAB) for _ in range(rnd.randint(3, 60))),
+            author=f"유저{rnd.randint(1, 500)}",
+            created_at=self.epoch - timedelta(minutes=age * 2),
+            views=rnd.randint(0, 50) + age // 3,
+            upvotes=rnd.randint(0, 10),
+            comments=rnd.randint(0, 30) + self.extra_comments(no),
+        )
+
+    def extra_comments(self, no: int) -> int:
+        """시작 이후 새로 달린 댓글 수: comment_grow개/초를 hot 글들에 차례로 나눠 줌."""
+        rank = self.hot_top - no
+        if not self.cfg.comment_grow or not 0 <= rank < self.cfg.per_page:
+            return 0
+        grown = int((time.time() - self.started) * self.cfg.comment_grow)
+        return max(0, (grown - rank + self.cfg.per_page - 1) // self.cfg.per_page)
+
+    def comments(self, p: MockPost) -> list[MockComment]:
+        """글의 댓글 전체 (오래된 순). 댓글 번호는 글 안에서 증가."""
+        out = []
+        for i in range(1, p.comments + 1):
+            rnd = random.Random((self.cfg.seed * 1_000_003 + p.no) * 10_007 + i)
+            out.append(
+                MockComment(
+                    no=i,
+                    parent=rnd.randint(1, i - 1) if i > 1 and rnd.random() < 0.2 else None,
+                    author=f"유저{rnd.randint(1, 500)}",
+                    memo=" ".join(rnd.choice(VOCAB) for _ in range(rnd.randint(1, 12))),
+                    created_at=p.created_at + timedelta(minutes=i),
+                )
+            )
+        return out
+
+    def page(self, page: int) -> list[MockPost]:
+        top = self.newest() - (page - 1) * self.cfg.per_page
+        nos = range(top, max(top - self.cfg.per_page, FIRST_NO - 1), -1)
+        return [p for p in (self.post(n) for n in nos) if p]
+
+
+# ---------------------------------------------------------------------------
+# 마크업 (layout별 변형)
+# ---------------------------------------------------------------------------
+
+def render_list(posts: list[MockPost], layout: str) -> str:
+    e = html.escape
+    rows = []
+    if layout == "alt":
+        # 변형: 공지/AD 행 섞임, data-no 없음(링크에서 번호), 작성자 data-nick 없음, 날짜 title 없음
+        rows.append(
+            '<tr class="ub-content us-post"><td class="gall_subject">공지</td>'
+            f'<td class="gall_tit"><a href="/mgallery/board/view/?id={GALLERY_ID}&no=1">공지사항</a></td></tr>'
+        )
+        rows.append('<tr class="ub-content us-post"><td class="gall_subject">AD</td><td class="gall_tit">광고</td></tr>')
+    for p in posts:
+        href = f"/mgallery/board/view/?id={GALLERY_ID}&no={p.no}&page=1&t=cv"
+        reply = f' <a class="reply_numbox"><span class="reply_num">[{p.comments}]</span></a>' if p.comments else ""
+        if layout == "alt":
+            rows.append(
+                '<tr class="ub-content us-post">'
+                f'<td class="gall_num">{p.no}</td><td class="gall_subject">일반</td>'
+                f'<td class="gall_tit ub-word"><a href="{href}">{e(p.title)}</a>{reply}</td>'
+                f'<td class="gall_writer ub-writer"><span class="nickname">{e(p.author)}</span></td>'
+                f'<td class="gall_date">{p.created_at:%H:%M}</td>'
+                f'<td class="gall_count">{p.views:,}</td><td class="gall_recommend">{p.upvotes}</td></tr>'
+            )
+        else:
+            rows.append(
+                f'<tr class="ub-content us-post" data-no="{p.no}" data-type="icon_txt">'
+                f'<td class="gall_num">{p.no}</td><td class="gall_subject">일반</td>'
+                f'<td class="gall_tit ub-word"><a href="{href}">{e(p.title)}</a>{reply}</td>'
+                f'<td class="gall_writer ub-writer" data-nick="{e(p.author)}" data-uid="">'
+                f'<span class="nickname">{e(p.author)}</span></td>'
+                f'<td class="gall_date" title="{p.created_at:%Y-%m-%d %H:%M:%S}">{p.created_at:%H:%M}</td>'
+                f'<td class="gall_count">{p.views}</td><td class="gall_recommend">{p.upvotes}</td></tr>'
+            )
+    return (
+        f'<html><body><input type="hidden" name="e_s_n_o" id="e_s_n_o" value="{ESNO}">'
+        "<table class=\"gall_list\"><tbody>"
+        + "".join(rows)
+        + "</tbody></table></body></html>"
+    )
+
+
+def render_view(p: MockPost, layout: str, broken: bool) -> str:
+    e = html.escape
+    head = (
+        f'<div class="gallview_head"><h3 class="title"><span class="title_headtext">[일반]</span> '
+        f'<span class="title_subject">{e(p.title)}</span></h3>'
+        f'<div class="gall_writer"><span class="nickname">{e(p.author)}</span>'
+        f'<span class="gall_date" title="{p.created_at:%Y-%m-%d %H:%M:%S}">{p.created_at:%Y.%m.%d %H:%M:%S}</span></div>'
+        f'<div class="fr"><span class="gall_count">조회 {p.views}</span>'
+        f'<span class="gall_reply_num">댓글 {p.comments}</span></div></div>'
+    )
+    if broken:
+        body = '<div class="view_ad">광고</div>'
+    elif layout == "alt":
+        # 변형: write_div 없이 view_content_wrap 안에 본문
+        body = f'<div class="view_content_wrap"><p>{e(p.body)}</p></div>'
+    else:
+        body = f'<div class="writing_view_box"><div class="write_div"><p>{e(p.body)}</p></div></div>'
+    token = f'<input type="hidden" name="e_s_n_o" id="e_s_n_o" value="{ESNO}">'
+    return f"<html><body>{token}{head}{body}</body></html>"
+
+
+def render_comments(comments: list[MockComment], page: int, size: int, newest_first: bool) -> str:
+    items = comments[::-1] if newest_first else comments
+    chunk = items[(page - 1) * size : page * size]
+    return json.dumps(
+        {
+            "total_cnt": len(comments),
+            "comment_cnt": len(comments),
+            "comments": [
+                {
+                    "no": str(c.no),
+                    "parent": str(c.parent) if c.parent else "",
+                    "name": c.author,
+                    "memo": html.escape(c.memo),
+                    "reg_date": f"{c.created_at:%m.%d %H:%M:%S}",
+                    "depth": 1 if c.parent else 0,
+                    "is_delete": "0",
+                }
+                for c in chunk
+            ],
+        },
+        ensure_ascii=False,
+    )
+
+
+# ---------------------------------------------------------------------------
+# 서버
+# ---------------------------------------------------------------------------
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr: tuple[str, int], cfg: MockConfig):
+        super().__init__(addr, Handler)
+        self.cfg = cfg
+        self.corpus = Corpus(cfg)
+        self.rng = random.Random(cfg.seed)
+        self.lock = threading.Lock()
+        # (종류, 상태코드) → 요청 수
+        self.hits: Counter = Counter()
+        self._bucket = float(cfg.rate_limit)
+        self._bucket_at = time.monotonic()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _take_token(self) -> bool:
+        """토큰 버킷: 초당 rate_limit개, 최대 1초치까지 몰아 쓸 수 있음."""
+        if not self.cfg.rate_limit:
+            return True
+        now = time.monotonic()
+        self._bucket = min(self.cfg.rate_limit, self._bucket + (now - self._bucket_at) * self.cfg.rate_limit)
+        self._bucket_at = now
+        if self._bucket >= 1:
+            self._bucket -= 1
+            return True
+        return False
+
+    def decide(self) -> tuple[int, float, str, bool]:
+        """(상태코드, 지연 초, layout, 본문 누락 여부)를 한 번에 뽑는다."""
+        cfg = self.cfg
+        with self.lock:
+            r = self.rng.random()
+            delay = max(cfg.latency_ms + self.rng.uniform(-cfg.jitter_ms, cfg.jitter_ms), 0.0) / 1000
+            layout = cfg.layout if cfg.layout != "mixed" else self.rng.choice(["default", "alt"])
+            broken = self.rng.random() < cfg.broken_rate
+            if not self._take_token() or r < cfg.throttle_rate:
+                return 429, delay, layout, broken
+            if r < cfg.throttle_rate + cfg.error_rate:
+                return 500, delay, layout, broken
+        return 200, delay, layout, broken
+
+    def count(self, kind: str, status: int) -> None:
+        with self.lock:
+            self.hits[(kind, status)] += 1
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: MockServer
+
+    def log_message(self, format, *args):  # noqa: A002 - 기본 접근 로그 끔
+        pass
+
+    def _send(self, status: int, body: str, headers: Optional[dict] = None, ctype: str = "text/html") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{ctype}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        sp = urlsplit(self.path)
+        q = dict(parse_qsl(sp.query))
+        if sp.path.rstrip("/") == "/mgallery/board/lists":
+            kind = "list"
+        elif sp.path.rstrip("/") == "/mgallery/board/view":
+            kind = "view"
+        else:
+            self.server.count("other", 404)
+            return self._send(404, "not found")
+
+        status, delay, layout, broken = self.server.decide()
+        if delay:
+            time.sleep(delay)
+        self.server.count(kind, status)
+        if status == 429:
+            return self._send(429, "too many requests", {"Retry-After": str(self.server.cfg.retry_after)})
+        if status != 200:
+            return self._send(status, "server error")
+
+        corpus = self.server.corpus
+        if kind == "list":
+            page = int(q.get("page") or 1)
+            return self._send(200, render_list(corpus.page(page), layout))
+
+        no = int(re.sub(r"\D", "", q.get("no", "")) or 0)
+        post = corpus.post(no)
+        if not post:
+            self.server.count(kind, 404)
+            return self._send(404, "삭제된 게시물입니다.")
+        return self._send(200, render_view(post, layout, broken))
+
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = dict(parse_qsl(self.rfile.read(length).decode("utf-8")))
+        if urlsplit(self.path).path.rstrip("/") != "/board/comment":
+            self.server.count("other", 404)
+            return self._send(404, "not found")
+
+        status, delay, _, _ = self.server.decide()
+        if delay:
+            time.sleep(delay)
+        if status == 200 and form.get("e_s_n_o") != ESNO:
+            status = 403
+        self.server.count("comment", status)
+        if status == 429:
+            return self._send(429, "too many requests", {"Retry-After": str(self.server.cfg.retry_after)})
+        if status != 200:
+            return self._send(status, "error")
+
+        post = self.server.corpus.post(int(re.sub(r"\D", "", form.get("no", "")) or 0))
+        if not post:
+            return self._send(200, "", ctype="application/json")
+        page = int(form.get("comment_page") or 1)
+        body = render_comments(
+            self.server.corpus.comments(post), page, self.server.cfg.comment_page, form.get("sort") == "N"
+        )
+        return self._send(200, body, ctype="application/json")
+
+
+def add_mock_args(ap: argparse.ArgumentParser) -> None:
+    d = MockConfig()
+    ap.add_argument("--posts", type=int, default=d.posts, help="시작 시점 합성 글 수")
+    ap.add_argument("--per-page", type=int, default=d.per_page, help="목록 페이지당 글 수")
+    ap.add_argument("--grow", type=float, default=d.grow, help="초당 새로 올라오는 글 수")
+    ap.add_argument("--latency", type=float, default=d.latency_ms, help="응답 지연 평균(ms)")
+    ap.add_argument("--jitter", type=float, default=d.jitter_ms, help="응답 지연 ± 범위(ms)")
+    ap.add_argument("--error-rate", type=float, default=d.error_rate, help="500 응답 비율 (0~1)")
+    ap.add_argument("--throttle-rate", type=float, default=d.throttle_rate, help="무작위 429 응답 비율 (0~1)")
+    ap.add_argument("--rate-limit", type=float, default=d.rate_limit, help="초당 허용 요청 수, 넘으면 429 (0=무제한)")
+    ap.add_argument("--retry-after", type=int, default=d.retry_after, help="429 응답의 Retry-After(초)")
+    ap.add_argument("--layout", choices=["default", "alt", "mixed"], default=d.layout, help="마크업 변형")
+    ap.add_argument("--broken-rate", type=float, default=d.broken_rate, help="본문 칸이 빠진 상세 페이지 비율")
+    ap.add_argument("--comment-grow", type=float, default=d.comment_grow, help="초당 새 댓글 수 (첫 페이지 글들에)")
+    ap.add_argument("--comment-page", type=int, default=d.comment_page, help="댓글 API 한 페이지 크기")
+    ap.add_argument("--seed", type=int, default=d.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        posts=args.posts,
+        per_page=args.per_page,
+        grow=args.grow,
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        layout=args.layout,
+        broken_rate=args.broken_rate,
+        comment_grow=args.comment_grow,
+        comment_page=args.comment_page,
+        seed=args.seed,
+    )
+
+
+def start(cfg: MockConfig, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    """백그라운드 스레드로 서버를 띄운다 (port=0이면 빈 포트)."""
+    srv = MockServer((host, port), cfg)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main():
+    ap = argparse.ArgumentParser(description="디시 갤러리 대역 목 서버 (크롤러 부하/장애 테스트용)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    add_mock_args(ap)
+    args = ap.parse_args()
+
+    srv = MockServer((args.host, args.port), config_from_args(args))
+    print(f"[OK] mock gallery on {srv.base_url} (posts={args.posts}, layout={args.layout})")
+    print(f"     VOC_BASE_URL={srv.base_url} VOC_DB_PATH=/tmp/voc_mock.db python src/fetch_list.py --pages 3")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[SERVER] {dict(srv.hits)}")
+
+
+if __name__ == "__main__":
+    main()
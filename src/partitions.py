@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import stat
+from contextlib import closing
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+from storage import CHUNK, DB_PATH, connect, encode_body, load_bodies
+
+
+# 글은 fetched_at의 월(YYYY-MM) 기준으로 나눈다.
+# 최근 KEEP_MONTHS개월은 voc.db(활성 파티션)에 두고, 그 이전 달은 data/archive/voc-YYYY-MM.db로 옮긴다.
+# 집계(post_topic/topic_daily/keyword_daily_hits), 수집 큐, 사전(body_dicts)은 항상 voc.db에 남는다.
+KEEP_MONTHS = 3
+ARCHIVE_DIR = "archive"
+
+# 아카이브 본문은 한 번 쓰고 거의 안 읽으므로 느려도 최대한 작게
+ARCHIVE_ZSTD_LEVEL = 19
+
+# 아카이브로 옮기는 테이블 (나머지는 활성 DB에 유지)
+_ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {s}.post_bodies (
+  post_id INTEGER PRIMARY KEY,
+  codec TEXT NOT NULL,
+  dict_id INTEGER,
+  data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS {s}.post_metrics_snapshot (
+  post_no INTEGER NOT NULL,
+  ts TEXT NOT NULL,
+  views INTEGER,
+  upvotes INTEGER,
+  comments INTEGER
+);
+CREATE INDEX IF NOT EXISTS {s}.idx_archive_fetched_at ON posts(fetched_at);
+CREATE INDEX IF NOT EXISTS {s}.idx_archive_post_no ON posts(post_no);
+CREATE INDEX IF NOT EXISTS {s}.idx_archive_snapshot ON post_metrics_snapshot(post_no, ts);
+"""
+
+
+def month_of(ymd: str) -> str:
+    return ymd[:7]
+
+
+def next_month(month: str) -> str:
+    y, m = int(month[:4]), int(month[5:7])
+    return f"{y + m // 12:04d}-{m % 12 + 1:02d}"
+
+
+def month_range(month: str) -> tuple[str, str]:
+    """[월 1일, 다음 달 1일) — fetched_at 문자열 비교용."""
+    return f"{month}-01", f"{next_month(month)}-01"
+
+
+def cutoff_month(keep: int, today: Optional[date] = None) -> str:
+    """이 달(포함) 이후는 활성 파티션에 남긴다."""
+    today = today or date.today()
+    m = today.year * 12 + today.month - 1 - (keep - 1)
+    return f"{m // 12:04d}-{m % 12 + 1:02d}"
+
+
+def main_path(conn: sqlite3.Connection) -> Path:
+    for _, name, file in conn.execute("PRAGMA database_list"):
+        if name == "main" and file:
+            return Path(file)
+    return DB_PATH
+
+
+def db_dir(conn: sqlite3.Connection) -> Path:
+    return main_path(conn).parent
+
+
+def _alias(month: str) -> str:
+    return "p_" + month.replace("-", "_")
+
+
+def _ro_uri(path: Path) -> str:
+    return f"file:{quote(str(path.resolve()))}?mode=ro"
+
+
+# ---------------------------------------------------------------------------
+# 읽기: 필요한 달만 붙였다 떼며 하나의 흐름처럼
+# ---------------------------------------------------------------------------
+
+def catalog(conn: sqlite3.Connection) -> list[tuple[str, str, int, Optional[int], Optional[int], Optional[int]]]:
+    return conn.execute(
+        "SELECT month, path, posts, min_id, max_id, bytes FROM partitions ORDER BY month"
+    ).fetchall()
+
+
+def sources(
+    conn: sqlite3.Connection,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    after_id: Optional[int] = None,
+    newest_first: bool = True,
+) -> Iterator[str]:
+    """조건에 걸리는 파티션의 스키마 이름을 id 순서대로 하나씩 돌려준다 ("main" + 아카이브).
+
+    아카이브는 차례가 왔을 때만 읽기 전용으로 ATTACH하고, 다음으로 넘어가면 DETACH한다.
+    (SQLite는 동시에 붙일 수 있는 DB 수가 10개로 제한돼 있어 한 번에 다 붙이지 않음)
+    DETACH 전에 그 파티션을 읽던 커서를 닫아야 한다. 못 떼면 예외를 그대로 올려 연결을 버리게 한다.
+    id는 수집 순서대로 증가하므로 "main → 최근 달 → 오래된 달"이 곧 id 내림차순이다.
+    """
+    archives = []
+    for month, path, _, _, max_id, _ in catalog(conn):
+        if since and next_month(month) + "-01" <= since:
+            continue
+        if until and month + "-01" > until:
+            continue
+        if after_id is not None and (max_id or 0) <= after_id:
+            continue
+        archives.append((month, db_dir(conn) / path))
+
+    order = ["main"] + sorted(archives, reverse=True) if newest_first else sorted(archives) + ["main"]
+    for src in order:
+        if src == "main":
+            yield "main"
+            continue
+        month, path = src
+        alias = _alias(month)
+        if not path.exists():
+            print(f"[WARN] archive missing: {path} (skip {month})")
+            continue
+        conn.execute("ATTACH DATABASE ? AS " + alias, (_ro_uri(path),))
+        try:
+            yield alias
+        finally:
+            conn.execute("DETACH DATABASE " + alias)
+
+
+# ---------------------------------------------------------------------------
+# 보관(retention): 오래된 달 → 읽기 전용 아카이브
+# ---------------------------------------------------------------------------
+
+def active_months(conn: sqlite3.Connection) -> list[tuple[str, int]]:
+    return conn.execute(
+        "SELECT substr(fetched_at, 1, 7) AS m, COUNT(*) FROM posts WHERE fetched_at IS NOT NULL GROUP BY m ORDER BY m"
+    ).fetchall()
+
+
+def _posts_columns(conn: sqlite3.Connection) -> list[tuple[str, str]]:
+    # 구버전 호환용 posts.body는 항상 NULL이라 아카이브에 옮기지 않음
+    return [(r[1], r[2] or "") for r in conn.execute("PRAGMA main.table_info(posts)") if r[1] != "body"]
+
+
+def archive_month(conn: sqlite3.Connection, month: str) -> int:
+    """한 달치 글/본문/스냅샷을 아카이브 DB로 옮기고 활성 DB에서 지운다. 옮긴 글 수를 돌려준다.
+
+    복사 → 커밋 → 삭제 → 커밋 순서라 중간에 죽어도 다시 실행하면 이어서 끝난다(아카이브 쪽은 덮어씀).
+    """
+    start, end = month_range(month)
+    rel = f"{ARCHIVE_DIR}/voc-{month}.db"
+    path = db_dir(conn) / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        # 이미 보관한 달에 늦게 들어온 글: 잠깐 쓰기 가능으로 풀어서 추가
+        os.chmod(path, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    cols = _posts_columns(conn)
+    names = ", ".join(c for c, _ in cols)
+    defs = ", ".join(f"{c} {t}".strip() if c != "id" else "id INTEGER PRIMARY KEY" for c, t in cols)
+
+    conn.execute("ATTACH DATABASE ? AS arc", (str(path),))
+    try:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS arc.posts ({defs})")
+        conn.executescript(_ARCHIVE_SCHEMA.format(s="arc"))
+        conn.execute(
+            f"INSERT OR REPLACE INTO arc.posts ({names}) SELECT {names} FROM main.posts WHERE fetched_at >= ? AND fetched_at < ?",
+            (start, end),
+        )
+        ids = [r[0] for r in conn.execute("SELECT id FROM main.posts WHERE fetched_at >= ? AND fetched_at < ?", (start, end))]
+        for i in range(0, len(ids), CHUNK):
+            part = ids[i : i + CHUNK]
+            rows = []
+            for pid, body in load_bodies(conn, part).items():
+                codec, dict_id, blob = encode_body(conn, body, level=ARCHIVE_ZSTD_LEVEL)
+                rows.append((pid, codec, dict_id, blob))
+            conn.executemany("INSERT OR REPLACE INTO arc.post_bodies (post_id, codec, dict_id, data) VALUES (?, ?, ?, ?)", rows)
+        conn.execute(
+            """
+            INSERT INTO arc.post_metrics_snapshot (post_no, ts, views, upvotes, comments)
+            SELECT post_no, ts, views, upvotes, comments FROM main.post_metrics_snapshot
+            WHERE post_no IN (SELECT post_no FROM main.posts WHERE fetched_at >= ? AND fetched_at < ?)
+            EXCEPT
+            SELECT post_no, ts, views, upvotes, comments FROM arc.post_metrics_snapshot
+            """,
+            (start, end),
+        )
+        conn.commit()
+
+        # 복사가 끝난 뒤에만 활성 DB에서 삭제
+        conn.execute(
+            """
+            DELETE FROM main.post_metrics_snapshot
+            WHERE post_no IN (SELECT post_no FROM main.posts WHERE fetched_at >= ? AND fetched_at < ?)
+            """,
+            (start, end),
+        )
+        conn.execute(
+            "DELETE FROM main.post_bodies WHERE post_id IN (SELECT id FROM main.posts WHERE fetched_at >= ? AND fetched_at < ?)",
+            (start, end),
+        )
+        conn.execute("DELETE FROM main.posts WHERE fetched_at >= ? AND fetched_at < ?", (start, end))
+
+        n, min_id, max_id = conn.execute("SELECT COUNT(*), MIN(id), MAX(id) FROM arc.posts").fetchone()
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO partitions (month, path, posts, min_id, max_id, bytes, archived_at)
+            VALUES (?, ?, ?, ?, ?, NULL, ?)
+            """,
+            (month, rel, n, min_id, max_id, datetime.now().isoformat(timespec="seconds")),
+        )
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE arc")
+
+    # 아카이브는 한 번 쓰고 끝: 압축 후 읽기 전용으로
+    with closing(sqlite3.connect(path)) as arc:
+        arc.execute("VACUUM")
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    conn.execute("UPDATE partitions SET bytes = ? WHERE month = ?", (path.stat().st_size, month))
+    conn.commit()
+    return len(ids)
+
+
+def apply_retention(conn: sqlite3.Connection, keep: int = KEEP_MONTHS, dry_run: bool = False) -> list[tuple[str, int]]:
+    cutoff = cutoff_month(keep)
+    todo = [(m, n) for m, n in active_months(conn) if m < cutoff]
+    if dry_run:
+        return todo
+    return [(m, archive_month(conn, m)) for m, _ in todo]
+
+
+# ---------------------------------------------------------------------------
+# 유지보수: 활성 DB만
+# ---------------------------------------------------------------------------
+
+def maintain(conn: sqlite3.Connection) -> tuple[int, int]:
+    """활성 DB만 WAL 정리 + VACUUM + REINDEX + ANALYZE. (아카이브는 보관 시 한 번 VACUUM하고 이후 변경 없음)"""
+    path = main_path(conn)
+    before = path.stat().st_size
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.execute("REINDEX")
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return before, path.stat().st_size
+
+
+def main():
+    ap = argparse.ArgumentParser(description="월별 파티션: 오래된 달 보관(읽기 전용 아카이브) / 활성 DB 유지보수")
+    ap.add_argument("cmd", choices=["list", "archive", "maintain"], nargs="?", default="list")
+    ap.add_argument("--keep-months", type=int, default=KEEP_MONTHS, help="활성 DB에 남길 최근 개월 수 (이번 달 포함)")
+    ap.add_argument("--dry-run", action="store_true", help="archive: 옮길 달만 출력")
+    args = ap.parse_args()
+
+    with connect(DB_PATH) as conn:
+        if args.cmd == "archive":
+            done = apply_retention(conn, args.keep_months, args.dry_run)
+            tag = "DRY-RUN" if args.dry_run else "OK"
+            for month, n in done:
+                print(f"[{tag}] {month}: {n} posts → {ARCHIVE_DIR}/voc-{month}.db")
+            if not done:
+                print(f"[OK] nothing to archive (keep {args.keep_months} months from {cutoff_month(args.keep_months)})")
+            elif not args.dry_run:
+                print("[HINT] `python src/partitions.py maintain`으로 활성 DB 용량을 회수하세요.")
+        elif args.cmd == "maintain":
+            before, after = maintain(conn)
+            print(f"[OK] active DB vacuumed/reindexed: {before / 1e6:.1f} MB → {after / 1e6:.1f} MB")
+        else:
+            print("[ACTIVE]")
+            for month, n in active_months(conn):
+                print(f"- {month}: {n} posts")
+            print("[ARCHIVE]")
+            for month, path, n, min_id, max_id, size in catalog(conn):
+                print(f"- {month}: {n} posts, id {min_id}~{max_id}, {(size or 0) / 1e6:.1f} MB ({path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import sqlite3
+from collections import Counter
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+from keywords import TOPICS, NEG_WORDS
+from partitions import sources
+from storage import load_bodies
+
+
+# fetchmany 한 번에 가져올 행 수 (메모리 상한 = 배치 크기)
+BATCH = 500
+
+# 기간을 지정하지 않았을 때의 기존 동작: 최근 500개 글
+DEFAULT_LIMIT = 500
+
+# 토픽/부정 키워드 전체(중복 제거, 정의 순서 유지)
+ALL_KEYWORDS = list(dict.fromkeys([kw for kws in TOPICS.values() for kw in kws] + NEG_WORDS))
+
+T = TypeVar("T")
+
+
+@dataclass
+class Post:
+    id: int
+    url: str
+    title: str
+    body: str
+    fetched_at: str
+    post_no: Optional[int] = None
+    views: Optional[int] = None
+    upvotes: Optional[int] = None
+    comments: Optional[int] = None
+
+
+@dataclass
+class Scored:
+    post: Post
+    topic: str
+    hits: int
+    neg: bool
+    # 글에서 실제로 걸린 키워드(토픽 + 부정). keyword_daily_hits 집계용
+    keywords: tuple[str, ...] = ()
+    # 라벨 출처: "keyword"(키워드 argmax) / "model"(classifier.py가 OTHER를 다시 분류)
+    source: str = "keyword"
+
+    @property
+    def text(self) -> str:
+        return f"{self.post.title} {self.post.body}".strip()
+
+
+@dataclass
+class Window:
+    since: Optional[str] = None  # YYYY-MM-DD (포함)
+    until: Optional[str] = None  # YYYY-MM-DD (포함)
+    limit: Optional[int] = None
+
+    def label(self) -> str:
+        if self.since and self.until and self.since == self.until:
+            return self.since
+        if self.since or self.until:
+            return f"{self.since or '처음'} ~ {self.until or '현재'}"
+        return f"최근 {self.limit}개" if self.limit else "전체 기간"
+
+
+@dataclass
+class Aggregate:
+    topic_counts: Counter = field(default_factory=Counter)
+    topic_neg: Counter = field(default_factory=Counter)
+    # 참여도(조회/추천/댓글) 가중 볼륨. aggregates.topic_daily에서 읽을 때만 채워짐
+    topic_weight: Counter = field(default_factory=Counter)
+    # 그중 학습형 분류기가 붙인 라벨 수 (--classifier hybrid일 때만 채워짐)
+    topic_model: Counter = field(default_factory=Counter)
+    # 댓글 수 / 부정 댓글 수 (topic_daily에서 읽을 때만 채워짐, fetch_comments.py)
+    topic_comments: Counter = field(default_factory=Counter)
+    topic_comment_neg: Counter = field(default_factory=Counter)
+
+    @property
+    def total(self) -> int:
+        return sum(self.topic_counts.values())
+
+    def ranked(self, n: int = 10, weighted: bool = False) -> list[tuple[str, int]]:
+        # OTHER 제외, 볼륨(또는 가중 볼륨) 순
+        src = self.topic_weight if weighted else self.topic_counts
+        items = [(t, c) for t, c in src.items() if t != "OTHER"]
+        items.sort(key=lambda x: x[1], reverse=True)
+        return items[:n]
+
+
+def score_topic(text: str) -> tuple[str, int]:
+    best_topic = "OTHER"
+    best_score = 0
+    for topic, kws in TOPICS.items():
+        s = 0
+        for kw in kws:
+            if kw in text:
+                s += 1
+        if s > best_score:
+            best_topic, best_score = topic, s
+    return best_topic, best_score
+
+
+def is_negative(text: str) -> bool:
+    return any(w in text for w in NEG_WORDS)
+
+
+def match_keywords(text: str) -> tuple[str, ...]:
+    return tuple(kw for kw in ALL_KEYWORDS if kw in text)
+
+
+def score_matched(matched: Iterable[str]) -> tuple[str, int]:
+    """이미 찾은 키워드 집합으로 score_topic과 같은 결과를 낸다 (본문을 다시 훑지 않음)."""
+    found = set(matched)
+    best_topic = "OTHER"
+    best_score = 0
+    for topic, kws in TOPICS.items():
+        s = sum(1 for kw in kws if kw in found)
+        if s > best_score:
+            best_topic, best_score = topic, s
+    return best_topic, best_score
+
+
+# ---------------------------------------------------------------------------
+# 기간(window)
+# ---------------------------------------------------------------------------
+
+def add_window_args(ap: argparse.ArgumentParser, default: Optional[str] = None) -> None:
+    ap.add_argument("--window", choices=["day", "week", "month", "all"], default=default,
+                    help="분석 기간: day(오늘) / week(최근 7일) / month(최근 30일) / all(전체)")
+    ap.add_argument("--since", help="시작일 YYYY-MM-DD (포함)")
+    ap.add_argument("--until", help="종료일 YYYY-MM-DD (포함)")
+    ap.add_argument("--limit", type=int, help="최근 N개 글로 제한")
+
+
+def window_from_args(args: argparse.Namespace, today: Optional[date] = None) -> Window:
+    today = today or date.today()
+    w = Window(since=args.since, until=args.until, limit=args.limit)
+    if args.window and not (args.since or args.until):
+        days = {"day": 1, "week": 7, "month": 30}.get(args.window)
+        if days:
+            w.since = (today - timedelta(days=days - 1)).isoformat()
+            w.until = today.isoformat()
+    if not (args.window or w.since or w.until or w.limit):
+        w.limit = DEFAULT_LIMIT
+    return w
+
+
+# ---------------------------------------------------------------------------
+# 스트리밍 파이프라인: iter_posts → classify → aggregate / top_k
+# ---------------------------------------------------------------------------
+
+def iter_posts(
+    conn: sqlite3.Connection,
+    window: Window,
+    batch: int = BATCH,
+    after_id: Optional[int] = None,
+) -> Iterator[Post]:
+    """기간 안의 글을 batch개씩 읽어 본문과 함께 흘려보낸다.
+
+    기본은 최신순. after_id를 주면 그 이후 글만 id 오름차순으로 흘려보낸다(증분 처리용).
+    활성 DB에 없는 옛날 기간이면 해당 월 아카이브(partitions.py)를 차례로 붙여 이어서 읽는다.
+    """
+    remaining = window.limit
+    # 중간에 멈춰도 파티션 커서 → 아카이브 DETACH 순서로 닫히도록 명시적으로 close
+    with closing(sources(conn, window.since, window.until, after_id, newest_first=after_id is None)) as schemas:
+        for schema in schemas:
+            with closing(_iter_partition(conn, schema, window, batch, after_id, remaining)) as posts:
+                for p in posts:
+                    yield p
+                    if remaining is not None:
+                        remaining -= 1
+            if remaining is not None and remaining <= 0:
+                return
+
+
+def _iter_partition(
+    conn: sqlite3.Connection,
+    schema: str,
+    window: Window,
+    batch: int,
+    after_id: Optional[int],
+    limit: Optional[int],
+) -> Iterator[Post]:
+    where, params = [], []
+    if after_id is not None:
+        where.append("id > ?")
+        params.append(after_id)
+    if window.since:
+        where.append("fetched_at >= ?")
+        params.append(window.since)
+    if window.until:
+        # fetched_at은 'YYYY-MM-DDTHH:MM:SS' 이므로 다음날 0시 미만으로 비교
+        nxt = (date.fromisoformat(window.until) + timedelta(days=1)).isoformat()
+        where.append("fetched_at < ?")
+        params.append(nxt)
+    sql = f"SELECT id, url, title, fetched_at, post_no, views, upvotes, comments FROM {schema}.posts"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id DESC" if after_id is None else " ORDER BY id"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    cur = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            bodies = load_bodies(conn, [r[0] for r in rows], schema)
+            for pid, url, title, fetched_at, post_no, views, upvotes, comments in rows:
+                yield Post(
+                    id=pid,
+                    url=url,
+                    title=title or "",
+                    body=bodies.get(pid, ""),
+                    fetched_at=fetched_at or "",
+                    post_no=post_no,
+                    views=views,
+                    upvotes=upvotes,
+                    comments=comments,
+                )
+    finally:
+        cur.close()
+
+
+def classify(posts: Iterable[Post]) -> Iterator[Scored]:
+    for p in posts:
+        text = f"{p.title} {p.body}".strip()
+        matched = match_keywords(text)
+        topic, hits = score_matched(matched)
+        if hits == 0:
+            topic = "OTHER"
+        neg = any(w in matched for w in NEG_WORDS)
+        yield Scored(post=p, topic=topic, hits=hits, neg=neg, keywords=matched)
+
+
+def aggregate(scored: Iterable[Scored], agg: Optional[Aggregate] = None) -> Aggregate:
+    agg = agg or Aggregate()
+    for _ in tee_aggregate(scored, agg):
+        pass
+    return agg
+
+
+def tee_aggregate(scored: Iterable[Scored], agg: Aggregate) -> Iterator[Scored]:
+    """집계하면서 그대로 다음 단계로 넘긴다 (한 번의 스캔으로 집계 + top-K)."""
+    for s in scored:
+        agg.topic_counts[s.topic] += 1
+        if s.neg:
+            agg.topic_neg[s.topic] += 1
+        if s.source == "model":
+            agg.topic_model[s.topic] += 1
+        yield s
+
+
+def top_k(items: Iterable[T], k: int, key: Callable[[T], tuple]) -> list[T]:
+    return heapq.nlargest(k, items, key=key)
+
+
+class TopKByGroup:
+    """그룹(토픽)별로 상위 k개만 유지하는 힙 모음."""
+
+    def __init__(self, k: int, key: Callable[[Scored], tuple]):
+        self.k = k
+        self.key = key
+        self._heaps: dict[str, list] = {}
+        self._seq = 0
+
+    def push(self, group: str, item: Scored) -> None:
+        h = self._heaps.setdefault(group, [])
+        self._seq += 1
+        entry = (self.key(item), -self._seq, item)
+        if len(h) < self.k:
+            heapq.heappush(h, entry)
+        elif entry[:2] > h[0][:2]:
+            heapq.heapreplace(h, entry)
+
+    def get(self, group: str) -> list[Scored]:
+        return [e[2] for e in sorted(self._heaps.get(group, []), key=lambda e: e[:2], reverse=True)]
@@ -1,25 +1,124 @@
+from __future__ import annotations
+
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
 from pathlib import Path
-from datetime import date
+from typing import Iterable, Iterator, Optional
 
-def main():
-    base = Path(__file__).resolve().parents[1]  # 프로젝트 루트
-    reports_dir = base / "reports"
-    reports_dir.mkdir(exist_ok=True)
+from action_cards import evidence_key, make_cards
+from aggregates import classify_new_comments, classify_new_posts, daily_aggregates, days_with_data, rebuild
+from analyze import render_top10_section, skeleton, upsert_section
+from highlights import candidates, highlight_score, render_highlights
+from pipeline import Aggregate, Scored, TopKByGroup, Window, classify, iter_posts, top_k
+from storage import DB_PATH, connect
+from trending import NO_YESTERDAY, render_trending
 
-    today = date.today().isoformat()  # 예: 2026-02-25
-    out = reports_dir / f"{today}.md"
+BASE = Path(__file__).resolve().parents[1]
+REPORTS_DIR = BASE / "reports"
+
+
+def report_path(day: str) -> Path:
+    return REPORTS_DIR / f"{day}.md"
+
+
+def build_day(day: str, agg: Aggregate, trend: Optional[tuple[str, Counter, str, Counter]]) -> tuple[str, int]:
+    """하루치 리포트를 처음부터 다시 쓴다. 그날 수집된 글과 그날까지의 일자 집계만 사용.
+
+    TOP10/급상승은 미리 계산된 일자 집계(agg)를 받아 쓰고, 글을 읽어야 하는 근거 글/하이라이트는
+    그날 글을 한 번만 훑어 같이 뽑는다.
+    """
+    window = Window(since=day, until=day)
+    evidence = TopKByGroup(k=2, key=evidence_key)
+
+    def tee_evidence(scored: Iterable[Scored]) -> Iterator[Scored]:
+        for s in scored:
+            evidence.push(s.topic, s)
+            yield s
+
+    with connect(DB_PATH) as conn:
+        ranked = top_k(candidates(tee_evidence(classify(iter_posts(conn, window)))), 3, key=highlight_score)
+
+    top_topics = [t for t, _ in agg.ranked(3)]
+    posts_by_topic = {t: [s.post for s in evidence.get(t)] for t in top_topics}
+
+    trending = render_trending(trend[1], trend[3], trend[0], trend[2]) if trend else NO_YESTERDAY
 
-    content = f"""# 컴프야 VOC 레이더 리포트
-- Date: {today}
+    # run_daily.sh와 같은 순서로 채워 같은 레이아웃이 되게 (하이라이트는 뼈대에 없어 맨 뒤에 붙음)
+    md = skeleton(day)
+    md = upsert_section(md, "## 오늘의 이슈 TOP10", render_top10_section(agg, window))
+    md = upsert_section(md, "## 오늘 신규 글 하이라이트 (TOP3)", render_highlights(ranked))
+    md = upsert_section(md, "## Issue → Action 카드 3장", make_cards(posts_by_topic, top_topics))
+    md = upsert_section(md, "## 급상승 TOP3 (vs 어제)", trending)
+    report_path(day).write_text(md, encoding="utf-8")
+    return day, agg.total
 
-## 오늘의 이슈 TOP10
 
-## 급상승 TOP3 (vs 어제)
+def _build(task: tuple) -> tuple[str, int]:
+    return build_day(*task)
+
+
+def regenerate(since: str, until: str, workers: int, reclassify: bool = False) -> list[tuple[str, int]]:
+    """TOP10/급상승/카드 토픽 선정은 캐시된 일자 집계(topic_daily)를 읽고, 근거 글/하이라이트만 그날 글을 다시 분류한다.
+
+    키워드를 고친 뒤에는 reclassify=True로 집계를 처음부터 다시 만들어야 모든 섹션이 새 사전을 따른다.
+    """
+    with connect(DB_PATH) as conn:
+        if reclassify:
+            rebuild(conn)
+            classify_new_comments(conn)
+        else:
+            classify_new_posts(conn)
+        days = sorted(d for d in days_with_data(conn) if d)
+        aggs = daily_aggregates(conn, until=until)
+
+    tasks = []
+    d, end = date.fromisoformat(since), date.fromisoformat(until)
+    while d <= end:
+        ymd = d.isoformat()
+        # 그날 실행했다면 trending.py가 비교했을 두 날: 그날까지의 마지막 수집일과 그 전 수집일
+        upto = [x for x in days if x <= ymd]
+        trend = None
+        if len(upto) >= 2:
+            trend = (upto[-1], aggs[upto[-1]].topic_counts, upto[-2], aggs[upto[-2]].topic_counts)
+        tasks.append((ymd, aggs.get(ymd, Aggregate()), trend))
+        d += timedelta(days=1)
+
+    REPORTS_DIR.mkdir(exist_ok=True)
+    if workers <= 1:
+        return [_build(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(_build, tasks))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="리포트 뼈대 생성 / 기간 리포트 일괄 재생성")
+    ap.add_argument("--from", dest="since", help="재생성 시작일 YYYY-MM-DD (포함)")
+    ap.add_argument("--to", dest="until", help="재생성 종료일 YYYY-MM-DD (포함, 기본: 시작일)")
+    ap.add_argument("--workers", type=int, default=4, help="날짜별 병렬 프로세스 수")
+    ap.add_argument("--rebuild", action="store_true", help="재생성 전에 일자 집계를 전부 다시 분류 (키워드를 고친 경우)")
+    args = ap.parse_args()
+
+    if args.since:
+        until = args.until or args.since
+        if until < args.since:
+            ap.error("--to는 --from 이후여야 합니다")
+        t0 = time.perf_counter()
+        done = regenerate(args.since, until, args.workers, args.rebuild)
+        print(f"[OK] regenerated {len(done)} reports ({args.since} ~ {until}) in {time.perf_counter() - t0:.1f}s")
+        for day, n in done[:3]:
+            print(f" - {report_path(day)} (posts={n})")
+        return
+
+    REPORTS_DIR.mkdir(exist_ok=True)
+
+    today = date.today().isoformat()  # 예: 2026-02-25
+    out = report_path(today)
 
-## Issue → Action 카드 3장
-"""
-    out.write_text(content, encoding="utf-8")
+    out.write_text(skeleton(today), encoding="utf-8")
     print(f"[OK] Wrote report: {out}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,545 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+try:
+    import zstandard
+except ImportError:  # 선택 의존성: 없으면 zlib로 저장
+    zstandard = None
+
+
+BASE = Path(__file__).resolve().parents[1]
+# 부하 테스트 등에서 별도 DB를 쓰려면 VOC_DB_PATH로 지정
+DB_PATH = Path(os.environ.get("VOC_DB_PATH") or BASE / "data" / "voc.db")
+
+# 본문 저장 코덱: zstd(사전 압축, zstandard 필요) / zlib / raw
+BODY_CODEC = os.environ.get("VOC_BODY_CODEC", "zstd" if zstandard else "zlib")
+
+# 이 길이 미만의 본문은 압축해도 이득이 없어 그대로 저장
+MIN_COMPRESS_BYTES = 64
+
+# IN (...) 절 하나에 넣을 최대 id 수 (SQLite 변수 개수 제한 대비)
+CHUNK = 500
+
+# init_db가 만드는 스키마/이전 작업의 버전 (PRAGMA user_version). 테이블/컬럼/이전 작업을 추가하면 올린다
+SCHEMA_VERSION = 2
+
+
+def init_db(conn: sqlite3.Connection) -> None:
+    # 이미 최신 스키마면 DDL/백필/본문 이전 확인을 건너뜀 (connect()마다 불리므로)
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          url TEXT UNIQUE,
+          created_at TEXT,
+          title TEXT,
+          body TEXT,
+          views INTEGER,
+          upvotes INTEGER,
+          fetched_at TEXT
+        );
+        """
+    )
+    # 본문은 메타데이터와 분리해 별도 테이블에 (압축) 저장한다.
+    # posts.body는 구버전 호환용 컬럼으로 남겨두고 항상 NULL로 비운다.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS post_bodies (
+          post_id INTEGER PRIMARY KEY,
+          codec TEXT NOT NULL,
+          dict_id INTEGER,
+          data BLOB NOT NULL
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS body_dicts (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          created_at TEXT,
+          samples INTEGER,
+          data BLOB NOT NULL
+        );
+        """
+    )
+    # 리스트 페이지 한 줄(tr)에서 얻는 메타데이터. 상세 수집 전/후 모두 갱신된다.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS list_meta (
+          post_no INTEGER PRIMARY KEY,
+          url TEXT,
+          title TEXT,
+          author TEXT,
+          created_at TEXT,
+          views INTEGER,
+          upvotes INTEGER,
+          comments INTEGER,
+          seen_at TEXT
+        );
+        """
+    )
+    add_columns(conn, "posts", {"post_no": "INTEGER", "author": "TEXT", "comments": "INTEGER", "metrics_at": "TEXT"})
+    backfill_post_no(conn)
+    # 같은 글이 리스트 페이지에 따라 page=1/page=2 등 다른 URL로 보일 수 있어 글 번호로 중복을 막는다
+    dedupe_post_no(conn)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_post_no ON posts(post_no)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_fetched_at ON posts(fetched_at)")
+
+    # 크롤링할 때마다 남기는 조회/추천/댓글 수 시계열 (참여도 속도 계산용)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS post_metrics_snapshot (
+          post_no INTEGER NOT NULL,
+          ts TEXT NOT NULL,
+          views INTEGER,
+          upvotes INTEGER,
+          comments INTEGER
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshot_post_ts ON post_metrics_snapshot(post_no, ts)")
+
+    # 글 1개당 분류 결과 1줄 + 일자/토픽별 누적 집계 (aggregates.py가 증분 갱신)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS post_topic (
+          post_id INTEGER PRIMARY KEY,
+          post_no INTEGER,
+          day TEXT NOT NULL,
+          topic TEXT NOT NULL,
+          hits INTEGER NOT NULL,
+          neg INTEGER NOT NULL,
+          weight REAL NOT NULL
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_post_topic_post_no ON post_topic(post_no)")
+    # 상세 수집 작업 큐 (crawl_queue.py). 재시작해도 완료된 글은 다시 받지 않는다.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS crawl_queue (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          url TEXT NOT NULL,
+          post_no INTEGER UNIQUE,
+          state TEXT NOT NULL DEFAULT 'pending',  -- pending / running / done / failed
+          attempts INTEGER NOT NULL DEFAULT 0,
+          last_error TEXT,
+          next_attempt_at TEXT NOT NULL,
+          claimed_by TEXT,
+          claimed_at TEXT,
+          updated_at TEXT
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crawl_queue_ready ON crawl_queue(state, next_attempt_at)")
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS topic_daily (
+          day TEXT NOT NULL,
+          topic TEXT NOT NULL,
+          posts INTEGER NOT NULL DEFAULT 0,
+          neg INTEGER NOT NULL DEFAULT 0,
+          weight REAL NOT NULL DEFAULT 0,
+          PRIMARY KEY (day, topic)
+        );
+        """
+    )
+    # 키워드별/일자별/(글의 최종)토픽별 적중 수. 키워드 튜닝용 (keyword_stats.py)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS keyword_daily_hits (
+          day TEXT NOT NULL,
+          keyword TEXT NOT NULL,
+          topic TEXT NOT NULL,
+          hits INTEGER NOT NULL DEFAULT 0,
+          PRIMARY KEY (day, keyword, topic)
+        );
+        """
+    )
+    # 학습형 분류기(classifier.py) 카운트 배열 (zlib 압축)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS classifier_model (
+          name TEXT PRIMARY KEY,
+          dim INTEGER NOT NULL,
+          meta TEXT NOT NULL,
+          counts BLOB NOT NULL,
+          trained_upto INTEGER NOT NULL DEFAULT 0,
+          updated_at TEXT
+        );
+        """
+    )
+    # 월별 아카이브 DB 목록 (partitions.py). path는 voc.db 기준 상대 경로
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS partitions (
+          month TEXT PRIMARY KEY,
+          path TEXT NOT NULL,
+          posts INTEGER NOT NULL,
+          min_id INTEGER,
+          max_id INTEGER,
+          bytes INTEGER,
+          archived_at TEXT
+        );
+        """
+    )
+    # 댓글 (fetch_comments.py). 디시 댓글 번호는 글 안에서 증가하므로 (글 번호, 댓글 번호)로 중복을 막는다
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS comments (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          post_no INTEGER NOT NULL,
+          cmt_no INTEGER NOT NULL,
+          parent_no INTEGER,
+          author TEXT,
+          body TEXT,
+          created_at TEXT,
+          fetched_at TEXT NOT NULL,
+          UNIQUE (post_no, cmt_no)
+        );
+        """
+    )
+    # 글별 댓글 워터마크: 마지막으로 반영한 리스트 댓글 수 / 받은 댓글 중 가장 큰 번호
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS comment_state (
+          post_no INTEGER PRIMARY KEY,
+          seen INTEGER NOT NULL DEFAULT 0,
+          last_cmt_no INTEGER NOT NULL DEFAULT 0,
+          checked_at TEXT
+        );
+        """
+    )
+    # 댓글 1개당 분류 결과 1줄 (aggregates.classify_new_comments). topic_daily의 comments/comment_neg에 더해진다
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS comment_topic (
+          comment_id INTEGER PRIMARY KEY,
+          post_no INTEGER,
+          day TEXT NOT NULL,
+          topic TEXT NOT NULL,
+          hits INTEGER NOT NULL,
+          neg INTEGER NOT NULL
+        );
+        """
+    )
+    # 글이 늦게 분류됐을 때 그 글의 OTHER 댓글을 찾는다
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comment_topic_post_no ON comment_topic(post_no)")
+    add_columns(conn, "topic_daily", {"comments": "INTEGER NOT NULL DEFAULT 0", "comment_neg": "INTEGER NOT NULL DEFAULT 0"})
+    # 댓글 수집 후보는 최근 리스트에서 본 글만 훑는다
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_list_meta_seen_at ON list_meta(seen_at)")
+    # 작은 키-값 상태. generation: 분류/집계가 바뀔 때마다 1씩 증가 (api.py 캐시 무효화용)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta (
+          key TEXT PRIMARY KEY,
+          value INTEGER NOT NULL
+        );
+        """
+    )
+    conn.commit()
+
+    if conn.execute("SELECT 1 FROM posts WHERE body IS NOT NULL LIMIT 1").fetchone():
+        migrate_bodies(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def add_columns(conn: sqlite3.Connection, table: str, cols: dict[str, str]) -> None:
+    """구버전 DB에 없는 컬럼만 ALTER TABLE로 추가한다."""
+    have = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    for name, decl in cols.items():
+        if name not in have:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def post_no_from_url(url: str) -> Optional[int]:
+    no = dict(parse_qsl(urlsplit(url or "").query)).get("no", "")
+    return int(no) if no.isdigit() else None
+
+
+def backfill_post_no(conn: sqlite3.Connection) -> None:
+    rows = conn.execute("SELECT id, url FROM posts WHERE post_no IS NULL").fetchall()
+    if rows:
+        conn.executemany(
+            "UPDATE posts SET post_no = ? WHERE id = ?",
+            [(post_no_from_url(url), pid) for pid, url in rows],
+        )
+
+
+def dedupe_post_no(conn: sqlite3.Connection) -> int:
+    """구버전 DB에서 같은 글 번호가 URL만 다르게(모바일/PC, 파라미터 순서) 여러 번 저장된 경우 가장 먼저 저장된 것만 남긴다.
+
+    UNIQUE 인덱스를 만들기 전에 한 번만 필요하다.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_posts_post_no'").fetchone():
+        return 0
+    dup = [
+        r[0]
+        for r in conn.execute(
+            """
+            SELECT id FROM posts
+            WHERE post_no IS NOT NULL
+              AND id NOT IN (SELECT MIN(id) FROM posts WHERE post_no IS NOT NULL GROUP BY post_no)
+            """
+        )
+    ]
+    for i in range(0, len(dup), CHUNK):
+        part = dup[i : i + CHUNK]
+        marks = ",".join("?" * len(part))
+        conn.execute(f"DELETE FROM post_bodies WHERE post_id IN ({marks})", part)
+        conn.execute(f"DELETE FROM posts WHERE id IN ({marks})", part)
+    if dup:
+        print(f"[MIGRATE] removed {len(dup)} duplicate posts (same post_no, kept the earliest)")
+    return len(dup)
+
+
+def bump_generation(conn: sqlite3.Connection) -> None:
+    """집계가 바뀌었음을 알린다. 호출한 쪽의 트랜잭션과 같이 커밋된다."""
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('generation', 1) ON CONFLICT(key) DO UPDATE SET value = value + 1"
+    )
+
+
+def generation(conn: sqlite3.Connection) -> int:
+    return meta_value(conn, "generation")
+
+
+def meta_value(conn: sqlite3.Connection, key: str, default: int = 0) -> int:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_meta(conn: sqlite3.Connection, key: str, value: int) -> None:
+    """호출한 쪽의 트랜잭션과 같이 커밋된다."""
+    conn.execute("INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
+
+
+def connect(path: Path = DB_PATH) -> sqlite3.Connection:
+    # 여러 수집 워커가 같은 DB에 쓰므로 잠금 대기 시간을 넉넉히 + WAL(읽기와 쓰기가 서로 막지 않음)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    init_db(conn)
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# 압축/해제
+# ---------------------------------------------------------------------------
+
+_zstd_dicts: dict[int, "zstandard.ZstdCompressionDict"] = {}
+# (압)축기 객체는 스레드 간 공유가 안 되므로 스레드마다 따로 (api.py는 요청을 여러 스레드에서 처리)
+_codecs = threading.local()
+
+
+def _thread_cache(name: str) -> dict:
+    cache = getattr(_codecs, name, None)
+    if cache is None:
+        cache = {}
+        setattr(_codecs, name, cache)
+    return cache
+
+
+def _zstd_dict(conn: sqlite3.Connection, dict_id: int) -> "zstandard.ZstdCompressionDict":
+    d = _zstd_dicts.get(dict_id)
+    if d is None:
+        row = conn.execute("SELECT data FROM body_dicts WHERE id = ?", (dict_id,)).fetchone()
+        if not row:
+            raise KeyError(f"body_dicts id={dict_id} not found")
+        d = zstandard.ZstdCompressionDict(row[0])
+        _zstd_dicts[dict_id] = d
+    return d
+
+
+def latest_dict_id(conn: sqlite3.Connection) -> Optional[int]:
+    row = conn.execute("SELECT MAX(id) FROM body_dicts").fetchone()
+    return row[0] if row else None
+
+
+def encode_body(
+    conn: sqlite3.Connection, text: str, codec: str = BODY_CODEC, level: int = 9
+) -> tuple[str, Optional[int], bytes]:
+    """level은 zstd 압축 레벨 (아카이브는 느려도 작게 19)."""
+    raw = (text or "").encode("utf-8")
+    if len(raw) < MIN_COMPRESS_BYTES or codec == "raw":
+        return "raw", None, raw
+
+    if codec == "zstd" and zstandard is not None:
+        dict_id = latest_dict_id(conn)
+        compressors = _thread_cache("compressors")
+        c = compressors.get((dict_id, level))
+        if c is None:
+            zd = _zstd_dict(conn, dict_id) if dict_id is not None else None
+            c = zstandard.ZstdCompressor(level=level, dict_data=zd)
+            compressors[(dict_id, level)] = c
+        blob = c.compress(raw)
+        if len(blob) < len(raw):
+            return "zstd", dict_id, blob
+        return "raw", None, raw
+
+    blob = zlib.compress(raw, 9)
+    if len(blob) < len(raw):
+        return "zlib", None, blob
+    return "raw", None, raw
+
+
+def decode_body(conn: sqlite3.Connection, codec: str, dict_id: Optional[int], data: bytes) -> str:
+    if codec == "raw":
+        raw = data
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd 본문을 읽으려면 zstandard 패키지가 필요합니다 (pip install zstandard)")
+        decompressors = _thread_cache("decompressors")
+        d = decompressors.get(dict_id)
+        if d is None:
+            zd = _zstd_dict(conn, dict_id) if dict_id is not None else None
+            d = zstandard.ZstdDecompressor(dict_data=zd)
+            decompressors[dict_id] = d
+        raw = d.decompress(data)
+    else:
+        raise ValueError(f"unknown body codec: {codec}")
+    return raw.decode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# 본문 읽기/쓰기
+# ---------------------------------------------------------------------------
+
+def save_body(conn: sqlite3.Connection, post_id: int, text: str) -> None:
+    codec, dict_id, blob = encode_body(conn, text)
+    conn.execute(
+        "INSERT OR REPLACE INTO post_bodies (post_id, codec, dict_id, data) VALUES (?, ?, ?, ?)",
+        (post_id, codec, dict_id, blob),
+    )
+
+
+def load_bodies(conn: sqlite3.Connection, post_ids: Iterable[int], schema: str = "main") -> dict[int, str]:
+    """필요한 글의 본문만 골라 읽고 해제한다. 없는 id는 결과에서 빠진다.
+
+    schema: 붙여 둔(ATTACH) 월별 아카이브에서 읽을 때 그 이름. 사전(body_dicts)은 항상 main 것을 쓴다.
+    """
+    ids = list(post_ids)
+    out: dict[int, str] = {}
+    for i in range(0, len(ids), CHUNK):
+        part = ids[i : i + CHUNK]
+        qs = ",".join("?" * len(part))
+        for pid, codec, dict_id, data in conn.execute(
+            f"SELECT post_id, codec, dict_id, data FROM {schema}.post_bodies WHERE post_id IN ({qs})", part
+        ):
+            out[pid] = decode_body(conn, codec, dict_id, data)
+    return out
+
+
+def load_body(conn: sqlite3.Connection, post_id: int) -> str:
+    return load_bodies(conn, [post_id]).get(post_id, "")
+
+
+def migrate_bodies(conn: sqlite3.Connection) -> int:
+    """구버전 posts.body → post_bodies 로 옮기고 posts.body를 비운다."""
+    moved = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, body FROM posts WHERE body IS NOT NULL LIMIT ?", (CHUNK,)
+        ).fetchall()
+        if not rows:
+            break
+        for pid, body in rows:
+            save_body(conn, pid, body)
+        conn.executemany("UPDATE posts SET body = NULL WHERE id = ?", [(r[0],) for r in rows])
+        conn.commit()
+        moved += len(rows)
+    if moved:
+        print(f"[MIGRATE] moved {moved} bodies to post_bodies (run `python src/storage.py vacuum` to reclaim space)")
+    return moved
+
+
+def train_dictionary(conn: sqlite3.Connection, samples: int = 5000, dict_size: int = 64 * 1024) -> int:
+    """최근 본문으로 zstd 사전을 학습해 저장하고 id를 돌려준다."""
+    if zstandard is None:
+        raise RuntimeError("사전 학습에는 zstandard 패키지가 필요합니다 (pip install zstandard)")
+
+    ids = [r[0] for r in conn.execute("SELECT post_id FROM post_bodies ORDER BY post_id DESC LIMIT ?", (samples,))]
+    bodies = [b.encode("utf-8") for b in load_bodies(conn, ids).values() if b]
+    if len(bodies) < 100:
+        raise RuntimeError(f"사전 학습용 샘플이 부족합니다 (have {len(bodies)}, need >= 100)")
+
+    zd = zstandard.train_dictionary(dict_size, bodies)
+    now = datetime.now().isoformat(timespec="seconds")
+    cur = conn.execute(
+        "INSERT INTO body_dicts (created_at, samples, data) VALUES (?, ?, ?)",
+        (now, len(bodies), zd.as_bytes()),
+    )
+    conn.commit()
+    _thread_cache("compressors").clear()
+    return cur.lastrowid
+
+
+def recompress_bodies(conn: sqlite3.Connection) -> int:
+    """전체 본문을 현재 코덱/최신 사전으로 다시 압축한다."""
+    n = 0
+    last = 0
+    while True:
+        ids = [r[0] for r in conn.execute(
+            "SELECT post_id FROM post_bodies WHERE post_id > ? ORDER BY post_id LIMIT ?", (last, CHUNK)
+        )]
+        if not ids:
+            break
+        for pid, body in load_bodies(conn, ids).items():
+            save_body(conn, pid, body)
+        conn.commit()
+        last = ids[-1]
+        n += len(ids)
+    return n
+
+
+def body_stats(conn: sqlite3.Connection) -> str:
+    lines = []
+    for codec, cnt, size in conn.execute(
+        "SELECT codec, COUNT(*), SUM(length(data)) FROM post_bodies GROUP BY codec ORDER BY codec"
+    ):
+        lines.append(f"- {codec}: {cnt} bodies, {size or 0} bytes")
+    n_dicts = conn.execute("SELECT COUNT(*) FROM body_dicts").fetchone()[0]
+    lines.append(f"- dicts: {n_dicts}")
+    return "\n".join(lines)
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if not DB_PATH.exists():
+        raise FileNotFoundError(f"{DB_PATH} not found. Run fetch_posts.py first.")
+
+    with connect() as conn:
+        if cmd == "train-dict":
+            dict_id = train_dictionary(conn)
+            print(f"[OK] trained zstd dict id={dict_id}")
+            n = recompress_bodies(conn)
+            print(f"[OK] recompressed {n} bodies")
+        elif cmd == "recompress":
+            n = recompress_bodies(conn)
+            print(f"[OK] recompressed {n} bodies")
+        elif cmd == "vacuum":
+            conn.execute("VACUUM")
+            print(f"[OK] vacuumed {DB_PATH}")
+        elif cmd == "stats":
+            print(f"[CODEC] {BODY_CODEC}")
+            print(body_stats(conn))
+        else:
+            raise SystemExit("usage: python src/storage.py [stats|train-dict|recompress|vacuum]")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,98 +1,38 @@
 from __future__ import annotations
 
+import argparse
 import sqlite3
 from collections import Counter
-from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
+from typing import Optional
 
-from keywords import TOPICS, NEG_WORDS
+from aggregates import classify_new_posts, days_with_data, window_aggregate
+from analyze import upsert_section
+from pipeline import Window
+from storage import DB_PATH, connect
 
 BASE = Path(__file__).resolve().parents[1]
-DB_PATH = BASE / "data" / "voc.db"
 REPORT_PATH = BASE / "reports" / f"{date.today().isoformat()}.md"
 
 
-@dataclass
-class Row:
-    fetched_at: str
-    title: str
-    body: str
+def topic_counts_for_date(conn: sqlite3.Connection, ymd: str, weighted: bool = False) -> Counter:
+    # 일자/토픽 누적 집계(topic_daily)만 읽으므로 글 수와 무관하게 O(토픽)
+    agg = window_aggregate(conn, Window(since=ymd, until=ymd))
+    return agg.topic_weight if weighted else agg.topic_counts
 
 
-def score_topic(text: str) -> tuple[str, int]:
-    best_topic = "OTHER"
-    best_score = 0
-    for topic, kws in TOPICS.items():
-        s = 0
-        for kw in kws:
-            if kw in text:
-                s += 1
-        if s > best_score:
-            best_topic, best_score = topic, s
-    return best_topic, best_score
+NO_YESTERDAY = "- 어제 데이터가 없어 급상승 계산 불가 (내일 수집 후 자동 계산)\n"
 
 
-def upsert_section(md: str, header: str, content: str) -> str:
-    if header not in md:
-        return md.rstrip() + "\n\n" + header + "\n\n" + content
+def compare_days(conn: sqlite3.Connection, as_of: Optional[str] = None) -> Optional[tuple[str, str]]:
+    """(오늘, 어제) = as_of(기본: 전체) 이전의 마지막 수집일과 그 전 수집일. 2일치가 안 되면 None."""
+    days = [d for d in days_with_data(conn) if d and (as_of is None or d <= as_of)]
+    return (days[0], days[1]) if len(days) >= 2 else None
 
-    before, rest = md.split(header, 1)
-    rest = rest.lstrip("\n")
-    idx = rest.find("\n## ")
-    if idx == -1:
-        new_rest = "\n" + content
-    else:
-        new_rest = "\n" + content + "\n" + rest[idx + 1 :]
-    return before.rstrip() + "\n\n" + header + new_rest
-
-
-def topic_counts_for_date(conn: sqlite3.Connection, ymd: str) -> Counter:
-    rows = conn.execute(
-        """
-        SELECT fetched_at, title, body
-        FROM posts
-        WHERE date(fetched_at) = ?
-        """,
-        (ymd,),
-    ).fetchall()
-
-    c = Counter()
-    for _, title, body in rows:
-        text = f"{title or ''} {body or ''}".strip()
-        topic, sc = score_topic(text)
-        if sc == 0:
-            topic = "OTHER"
-        c[topic] += 1
-    return c
-
-
-def main():
-    if not DB_PATH.exists():
-        raise FileNotFoundError("data/voc.db not found. Run fetch_posts.py first.")
-    if not REPORT_PATH.exists():
-        raise FileNotFoundError("Report not found. Run report.py/analyze.py first.")
-
-    with sqlite3.connect(DB_PATH) as conn:
-        days = conn.execute(
-            "SELECT DISTINCT date(fetched_at) as d FROM posts ORDER BY d DESC"
-        ).fetchall()
-        days = [d[0] for d in days if d and d[0]]
-
-        if len(days) < 2:
-            content = "- 어제 데이터가 없어 급상승 계산 불가 (내일 수집 후 자동 계산)\n"
-            md = REPORT_PATH.read_text(encoding="utf-8")
-            md = upsert_section(md, "## 급상승 TOP3 (vs 어제)", content)
-            REPORT_PATH.write_text(md, encoding="utf-8")
-            print("[OK] wrote placeholder (need 2 days of data)")
-            return
-
-        today_ymd = days[0]
-        yday_ymd = days[1]
-
-        c_today = topic_counts_for_date(conn, today_ymd)
-        c_yday = topic_counts_for_date(conn, yday_ymd)
 
+def trending_deltas(c_today: Counter, c_yday: Counter, n: int = 3) -> list[tuple[str, float, float, float]]:
+    """(토픽, 증가량, 오늘, 어제) 증가량 상위 n개."""
     # OTHER는 노이즈라 급상승에서 제외 추천
     topics = set(c_today.keys()) | set(c_yday.keys())
     topics.discard("OTHER")
@@ -103,16 +43,53 @@ def main():
         deltas.append((t, delta, c_today.get(t, 0), c_yday.get(t, 0)))
 
     deltas.sort(key=lambda x: x[1], reverse=True)
-    top3 = deltas[:3]
+    return deltas[:n]
+
+
+def render_trending(c_today: Counter, c_yday: Counter, today_ymd: str, yday_ymd: str, weighted: bool = False) -> str:
+    top3 = trending_deltas(c_today, c_yday)
 
     lines = [f"- 비교 기준: {today_ymd} vs {yday_ymd}"]
     if not top3 or top3[0][1] <= 0:
         lines.append("- 급증 토픽 없음(증가량 ≤ 0)")
     else:
         for i, (t, d, ct, cy) in enumerate(top3, start=1):
-            lines.append(f"{i}) {t}: +{d} (오늘 {ct} / 어제 {cy})")
+            if weighted:
+                lines.append(f"{i}) {t}: +{d:.1f} (가중, 오늘 {ct:.1f} / 어제 {cy:.1f})")
+            else:
+                lines.append(f"{i}) {t}: +{d} (오늘 {ct} / 어제 {cy})")
+
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="전일 대비 급상승 TOP3")
+    ap.add_argument("--weighted", action="store_true", help="조회/추천/댓글 참여도 가중 볼륨으로 비교")
+    args = ap.parse_args()
+
+    if not DB_PATH.exists():
+        raise FileNotFoundError(f"{DB_PATH} not found. Run fetch_posts.py first.")
+    if not REPORT_PATH.exists():
+        raise FileNotFoundError("Report not found. Run report.py/analyze.py first.")
+
+    with connect(DB_PATH) as conn:
+        classify_new_posts(conn)
+        pair = compare_days(conn)
+
+        if pair is None:
+            content = NO_YESTERDAY
+            md = REPORT_PATH.read_text(encoding="utf-8")
+            md = upsert_section(md, "## 급상승 TOP3 (vs 어제)", content)
+            REPORT_PATH.write_text(md, encoding="utf-8")
+            print("[OK] wrote placeholder (need 2 days of data)")
+            return
+
+        today_ymd, yday_ymd = pair
+
+        c_today = topic_counts_for_date(conn, today_ymd, args.weighted)
+        c_yday = topic_counts_for_date(conn, yday_ymd, args.weighted)
 
-    content = "\n".join(lines) + "\n"
+    content = render_trending(c_today, c_yday, today_ymd, yday_ymd, args.weighted)
 
     md = REPORT_PATH.read_text(encoding="utf-8")
     md = upsert_section(md, "## 급상승 TOP3 (vs 어제)", content)